@@ -1,52 +1,464 @@
-def handle_page_fault_fifo(memory_manager, pid, page_num):
-    for i in range(memory_manager.num_frames):
-        if memory_manager.frames[i][1] == -1:
-            memory_manager.fifo_queue.append((pid, page_num))
-            return i
-
-    victim_pid, victim_page = memory_manager.fifo_queue.popleft()
-    memory_manager.fifo_queue.append((pid, page_num))
-    for i, (p, page) in enumerate(memory_manager.frames):
-        if p == victim_pid and page == victim_page:
-            return i
-    return -1
-
-
-def handle_page_fault_lru(memory_manager, pid, page_num):
-    for i in range(memory_manager.num_frames):
-        if memory_manager.frames[i][1] == -1:
-            memory_manager.lru_stack.append((pid, page_num))
-            return i
-
-    victim_pid, victim_page = memory_manager.lru_stack.pop(0)
-    memory_manager.lru_stack.append((pid, page_num))
-    for i, (p, page) in enumerate(memory_manager.frames):
-        if p == victim_pid and page == victim_page:
-            return i
-    return -1
-
-
-def replace_page_optimal(memory_manager, new_pid, new_page, future_sequence, page_size, processes):
-    frame_entries = [(pid, page) for pid, page in memory_manager.frames if page != -1]
-    next_use = {}
-
-    for pid, page in frame_entries:
-        next_use[(pid, page)] = float('inf')
-        for i, addr in enumerate(future_sequence):
-            seq_pid, va = addr
-            page_num = va // page_size
-            if seq_pid == pid:
-                for proc in processes.values():
-                    if proc.pid == pid and proc.page_table[page_num] == find_frame(memory_manager, pid, page):
-                        next_use[(pid, page)] = i
-                        break
-
-    victim_pid, victim_page = max(next_use, key=next_use.get)
-    return find_frame(memory_manager, victim_pid, victim_page)
+import heapq
+from collections import OrderedDict
+
+from page_tables import REFERENCED, DIRTY
+
+# Registry of replacement policies by display name, in registration order
+POLICIES = {}
+
+
+def register_policy(cls):
+    POLICIES[cls.name] = cls
+    return cls
+
+
+def available_policies():
+    return list(POLICIES)
+
+
+def create_policy(name, num_frames):
+    if name not in POLICIES:
+        raise ValueError(f"Unknown algorithm: {name}")
+    return POLICIES[name](num_frames)
+
+
+class ReplacementPolicy:
+    # Policies track resident pages by (pid, page_num) key. The engine calls
+    # on_access() on every hit, choose_victim() on a fault when no frame is
+    # free, and on_fault() once the faulting page has been loaded. remove()
+    # drops a page that left memory for any other reason. trim() runs at the
+    # start of every fault and returns pages the policy drops from memory on
+    # its own; must_replace() makes a fault evict even though frames are
+    # free. Policies that read page-table referenced/dirty bits do so through
+    # memory_manager, which the engine sets.
+    name = None
+    needs_future = False
+    memory_manager = None
+    trace_attributes = ()  # state derived from the whole trace, left out of checkpoints
+
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.trace_attributes:
+            state[name] = None
+        return state
+
+    def prepare(self, sequence, page_size):
+        pass
+
+    def adopt_trace(self, other):
+        # Shares the trace-derived state of a policy over the same trace
+        for name in self.trace_attributes:
+            setattr(self, name, getattr(other, name))
+
+    def yield_victim(self, key, step):
+        # choose_victim() for a fault another policy records, so on_fault()
+        # never follows here; leaves nothing waiting for that call
+        return self.choose_victim(key, step)
+
+    def resize(self, num_frames):
+        # Sets the number of frames the policy manages, for policies whose
+        # decisions depend on it. Slot-based policies keep their slots.
+        pass
+
+    def on_access(self, key, step):
+        pass
+
+    def trim(self, key, step):
+        return ()
+
+    def must_replace(self, key):
+        return False
+
+    def on_fault(self, key, step):
+        raise NotImplementedError
+
+    def choose_victim(self, key, step):
+        raise NotImplementedError
+
+    def remove(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+@register_policy
+class FIFOPolicy(ReplacementPolicy):
+    name = "FIFO"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.queue = OrderedDict()
+
+    def on_fault(self, key, step):
+        self.queue[key] = None
+
+    def choose_victim(self, key, step):
+        return self.queue.popitem(last=False)[0]
+
+    def remove(self, key):
+        self.queue.pop(key, None)
+
+
+@register_policy
+class LRUPolicy(FIFOPolicy):
+    name = "LRU"
+
+    def on_access(self, key, step):
+        self.queue.move_to_end(key)
+
+
+@register_policy
+class OptimalPolicy(ReplacementPolicy):
+    name = "Optimal"
+    needs_future = True
+    trace_attributes = ("next_use",)
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.next_use = []
+        self.resident = {}  # (pid, page_num) -> index of its next reference
+        self.heap = []  # (-next index, (pid, page_num)), may hold superseded entries
+
+    def prepare(self, sequence, page_size):
+        self.next_use = compute_next_use(sequence, page_size)
+
+    def on_access(self, key, step):
+        next_index = self.next_use[step]
+        self.resident[key] = next_index
+        heap = self.heap
+        heapq.heappush(heap, (-next_index, key))
+        # Superseded heap entries are skipped lazily; rebuild once they dominate
+        if len(heap) > 2 * len(self.resident) + 16:
+            heap[:] = [(-index, k) for k, index in self.resident.items()]
+            heapq.heapify(heap)
+
+    on_fault = on_access
+
+    def choose_victim(self, key, step):
+        heap = self.heap
+        while heap:
+            neg_index, victim = heapq.heappop(heap)
+            if self.resident.get(victim) == -neg_index:
+                del self.resident[victim]
+                return victim
+        raise LookupError("No resident page to evict.")
+
+    def remove(self, key):
+        self.resident.pop(key, None)
+
+
+@register_policy
+class ClockPolicy(ReplacementPolicy):
+    name = "CLOCK"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.slots = [None] * num_frames
+        self.referenced = bytearray(num_frames)
+        self.slot_of = {}
+        self.free_slots = list(range(num_frames - 1, -1, -1))
+        self.hand = 0
+
+    def on_access(self, key, step):
+        self.referenced[self.slot_of[key]] = 1
+
+    def on_fault(self, key, step):
+        slot = self.free_slots.pop()
+        self.slots[slot] = key
+        self.referenced[slot] = 1
+        self.slot_of[key] = slot
+
+    def choose_victim(self, key, step):
+        slots = self.slots
+        referenced = self.referenced
+        hand = self.hand
+        while True:
+            if slots[hand] is not None:
+                if not referenced[hand]:
+                    break
+                referenced[hand] = 0
+            hand = (hand + 1) % self.num_frames
+        victim = slots[hand]
+        self._free(hand, victim)
+        self.hand = (hand + 1) % self.num_frames
+        return victim
+
+    def remove(self, key):
+        slot = self.slot_of.get(key)
+        if slot is not None:
+            self._free(slot, key)
+
+    def _free(self, slot, key):
+        self.slots[slot] = None
+        del self.slot_of[key]
+        self.free_slots.append(slot)
+
+
+@register_policy
+class SecondChancePolicy(ReplacementPolicy):
+    name = "Second-Chance"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.queue = OrderedDict()  # (pid, page_num) -> referenced bit, oldest first
+
+    def on_access(self, key, step):
+        self.queue[key] = 1
+
+    on_fault = on_access
+
+    def choose_victim(self, key, step):
+        queue = self.queue
+        while True:
+            victim, referenced = queue.popitem(last=False)
+            if not referenced:
+                return victim
+            queue[victim] = 0
+
+    def remove(self, key):
+        self.queue.pop(key, None)
+
+
+@register_policy
+class EnhancedSecondChancePolicy(ClockPolicy):
+    # Clock over the (referenced, dirty) page-table bits, preferring pages
+    # that need no writeback: the first sweep looks for an unreferenced clean
+    # page without changing anything, the second for an unreferenced dirty
+    # page while clearing referenced bits, and both repeat once. The engine
+    # sets the referenced bit on every access.
+    name = "Enhanced-Second-Chance"
+
+    def on_access(self, key, step):
+        pass
+
+    def on_fault(self, key, step):
+        slot = self.free_slots.pop()
+        self.slots[slot] = key
+        self.slot_of[key] = slot
+
+    def choose_victim(self, key, step):
+        mm = self.memory_manager
+        slots = self.slots
+        for sweep in range(4):
+            want = DIRTY if sweep % 2 else 0
+            hand = self.hand
+            for _ in range(self.num_frames):
+                victim = slots[hand]
+                if victim is not None:
+                    flags = mm.page_flags(*victim)
+                    if flags & (REFERENCED | DIRTY) == want:
+                        self._free(hand, victim)
+                        self.hand = (hand + 1) % self.num_frames
+                        return victim
+                    if sweep % 2:
+                        mm.clear_referenced(*victim)
+                hand = (hand + 1) % self.num_frames
+        raise LookupError("No resident page to evict.")
+
+
+@register_policy
+class LFUPolicy(ReplacementPolicy):
+    name = "LFU"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.counts = {}
+        self.buckets = {}  # count -> OrderedDict of keys, least recently counted first
+        self.min_count = 0
+
+    def on_access(self, key, step):
+        count = self.counts[key]
+        self._unlink(key, count)
+        self._link(key, count + 1)
+
+    def on_fault(self, key, step):
+        self._link(key, 1)
+        self.min_count = 1
+
+    def choose_victim(self, key, step):
+        if self.min_count not in self.buckets:
+            self.min_count = min(self.buckets)
+        victim = next(iter(self.buckets[self.min_count]))
+        self._unlink(victim, self.min_count)
+        del self.counts[victim]
+        return victim
+
+    def remove(self, key):
+        count = self.counts.pop(key, None)
+        if count is not None:
+            self._unlink(key, count)
+
+    def _link(self, key, count):
+        self.counts[key] = count
+        bucket = self.buckets.get(count)
+        if bucket is None:
+            bucket = self.buckets[count] = OrderedDict()
+        bucket[key] = None
+
+    def _unlink(self, key, count):
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_count == count:
+                self.min_count = count + 1
+
+
+@register_policy
+class ARCPolicy(ReplacementPolicy):
+    # Adaptive Replacement Cache (Megiddo & Modha). t1/t2 hold resident pages
+    # seen once/more than once, b1/b2 are ghost lists of their recent victims
+    # and p is the adaptive target size of t1.
+    name = "ARC"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        self.p = 0
+        self.replaced = False
+
+    def on_access(self, key, step):
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        else:
+            self.t2.move_to_end(key)
+
+    def on_fault(self, key, step):
+        ghost = key in self.b1 or key in self.b2
+        if ghost:
+            if not self.replaced:
+                self._adapt(key)
+            self.b1.pop(key, None)
+            self.b2.pop(key, None)
+            self.t2[key] = None
+        else:
+            if not self.replaced:
+                # Memory was not full, only the ghost lists need trimming
+                c = self.num_frames
+                if len(self.t1) + len(self.b1) >= c and self.b1:
+                    self.b1.popitem(last=False)
+                if len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) >= 2 * c and self.b2:
+                    self.b2.popitem(last=False)
+            self.t1[key] = None
+        self.replaced = False
+
+    def choose_victim(self, key, step):
+        self.replaced = True
+        if key in self.b1 or key in self.b2:
+            self._adapt(key)
+            return self._replace(key)
+        c = self.num_frames
+        if len(self.t1) + len(self.b1) >= c:
+            if len(self.t1) < c:
+                self.b1.popitem(last=False)
+                return self._replace(key)
+            return self.t1.popitem(last=False)[0]
+        if len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) >= 2 * c:
+            self.b2.popitem(last=False)
+        return self._replace(key)
+
+    def yield_victim(self, key, step):
+        victim = self.choose_victim(key, step)
+        self.replaced = False
+        return victim
+
+    def resize(self, num_frames):
+        # Ghosts beyond the new capacity are forgotten, oldest first
+        self.num_frames = num_frames
+        self.p = min(self.p, num_frames)
+        while len(self.t1) + len(self.b1) > num_frames and self.b1:
+            self.b1.popitem(last=False)
+        while len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) > 2 * num_frames and self.b2:
+            self.b2.popitem(last=False)
+
+    def remove(self, key):
+        self.t1.pop(key, None)
+        self.t2.pop(key, None)
+
+    def _adapt(self, key):
+        if key in self.b1:
+            self.p = min(self.p + max(len(self.b2) // len(self.b1), 1), self.num_frames)
+        else:
+            self.p = max(self.p - max(len(self.b1) // len(self.b2), 1), 0)
+
+    def _replace(self, key):
+        t1_len = len(self.t1)
+        if t1_len and (not self.t2 or t1_len > self.p or (key in self.b2 and t1_len == self.p)):
+            victim = self.t1.popitem(last=False)[0]
+            self.b1[victim] = None
+        else:
+            victim = self.t2.popitem(last=False)[0]
+            self.b2[victim] = None
+        return victim
+
+
+@register_policy
+class TwoQueuePolicy(ReplacementPolicy):
+    # Full 2Q (Johnson & Shasha): new pages enter the a1in FIFO, pages evicted
+    # from it are remembered in the a1out ghost FIFO, and a page that faults
+    # again while remembered is promoted to the am LRU list.
+    name = "2Q"
+
+    def __init__(self, num_frames):
+        super().__init__(num_frames)
+        self.a1in = OrderedDict()
+        self.a1out = OrderedDict()
+        self.am = OrderedDict()
+        self.resize(num_frames)
+
+    def resize(self, num_frames):
+        self.num_frames = num_frames
+        self.kin = max(1, num_frames // 4)
+        self.kout = max(1, num_frames // 2)
+        while len(self.a1out) > self.kout:
+            self.a1out.popitem(last=False)
+
+    def on_access(self, key, step):
+        if key in self.am:
+            self.am.move_to_end(key)
+
+    def on_fault(self, key, step):
+        if key in self.a1out:
+            del self.a1out[key]
+            self.am[key] = None
+        else:
+            self.a1in[key] = None
+
+    def choose_victim(self, key, step):
+        if self.a1in and (len(self.a1in) > self.kin or not self.am):
+            victim = self.a1in.popitem(last=False)[0]
+            self.a1out[victim] = None
+            if len(self.a1out) > self.kout:
+                self.a1out.popitem(last=False)
+            return victim
+        return self.am.popitem(last=False)[0]
+
+    def remove(self, key):
+        self.a1in.pop(key, None)
+        self.am.pop(key, None)
+
+
+def compute_next_use(sequence, page_size):
+    # next_use[i] is the index of the next reference to the same (pid, page) as
+    # sequence[i], or len(sequence) if the page is never referenced again
+    n = len(sequence)
+    next_use = [n] * n
+    last_seen = {}
+    for i in range(n - 1, -1, -1):
+        item = sequence[i]
+        key = (item[0], item[1] // page_size)
+        next_use[i] = last_seen.get(key, n)
+        last_seen[key] = i
+    return next_use
 
 
 def find_frame(memory_manager, pid, page_num):
-    for i, (p, page) in enumerate(memory_manager.frames):
-        if p == pid and page == page_num:
-            return i
-    return -1
\ No newline at end of file
+    return memory_manager.frame_index.get((pid, page_num), -1)
\ No newline at end of file
@@ -0,0 +1,278 @@
+import argparse
+import sys
+from collections import OrderedDict
+
+from algorithms import POLICIES, ReplacementPolicy, create_policy
+from cli import add_output_argument, add_system_arguments, add_trace_arguments, build_engine, replay, write_csv
+
+ALLOCATIONS = ("equal", "proportional", "priority")
+CONTROLLERS = ("working-set", "pff")
+WORKING_SET_WINDOW = 10000  # references of a process's own virtual time
+PFF_INTERVAL = 1000
+RESIDENT_SET_FIELDS = ["pid", "allocation", "resident", "working_set", "references", "faults", "fault_rate"]
+
+
+def allocate_frames(num_frames, weights):
+    # Splits num_frames in proportion to weights (pid -> weight), at least
+    # one frame each, handing leftover frames to the largest remainders
+    pids = list(weights)
+    if num_frames < len(pids):
+        raise ValueError(f"{num_frames} frames cannot give each of {len(pids)} processes a frame.")
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Allocation weights must add up to a positive number.")
+    spare = num_frames - len(pids)
+    shares = {pid: spare * weights[pid] / total for pid in pids}
+    frames = {pid: 1 + int(shares[pid]) for pid in pids}
+    leftover = num_frames - sum(frames.values())
+    for pid in sorted(pids, key=lambda pid: shares[pid] - int(shares[pid]), reverse=True)[:leftover]:
+        frames[pid] += 1
+    return frames
+
+
+def initial_allocation(num_frames, processes, allocation="equal", priorities=None):
+    if allocation == "equal":
+        weights = {pid: 1 for pid in processes}
+    elif allocation == "proportional":
+        weights = {pid: process.num_pages for pid, process in processes.items()}
+    elif allocation == "priority":
+        priorities = priorities or {}
+        weights = {pid: priorities.get(pid, 1) for pid in processes}
+    else:
+        raise ValueError(f"Unknown frame allocation: {allocation}")
+    return allocate_frames(num_frames, weights)
+
+
+class LocalReplacementPolicy(ReplacementPolicy):
+    # Local replacement: every process holds an allocation of frames and,
+    # once it has filled it, evicts its own pages through a private instance
+    # of the replacement algorithm, sized to that allocation. Allocations
+    # start equal, proportional to process size or proportional to priority.
+    # A controller may then resize them at each fault:
+    # - working-set: the allocation follows the working set, the pages the
+    #   process referenced in its last window references, and pages that fall
+    #   out of the window are released.
+    # - pff: a fault within pff_interval references of the previous one adds
+    #   a frame; a later one releases every page not referenced since the
+    #   previous fault.
+    # Working sets are tracked under every mode. Whenever their total exceeds
+    # the frame count the system is thrashing, and each such episode is kept.
+    name = "Local"
+
+    def __init__(self, num_frames, algorithm="LRU", processes=None, allocation="equal", priorities=None,
+                 controller=None, window=WORKING_SET_WINDOW, pff_interval=PFF_INTERVAL):
+        super().__init__(num_frames)
+        if algorithm not in POLICIES:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        if controller is not None and controller not in CONTROLLERS:
+            raise ValueError(f"Unknown resident-set controller: {controller}")
+        if window < 1 or pff_interval < 1:
+            raise ValueError("The working-set window and PFF interval must be positive.")
+        processes = processes or {}
+        self.algorithm = algorithm
+        self.needs_future = POLICIES[algorithm].needs_future
+        self.trace_attributes = ("shared",) if POLICIES[algorithm].trace_attributes else ()
+        self.shared = {}  # trace-derived state shared by every process's policy
+        self.allocation = allocation
+        self.controller = controller
+        self.window = window
+        self.pff_interval = pff_interval
+        self.quota = initial_allocation(num_frames, processes, allocation, priorities) if processes else {}
+        self.policies = {}
+        self.pages = {}  # pid -> resident page numbers
+        self.references = {}  # pid -> references issued, the process's virtual time
+        self.faults = {}
+        self.windows = {}  # pid -> page -> virtual time of its last reference, oldest first
+        self.expired = {}  # pid -> pages that left the working set, for the working-set controller
+        self.used = {}  # pid -> pages referenced since the last fault, for PFF
+        self.last_fault = {}
+        self.working_set_total = 0
+        self.peak_working_set = 0
+        self.thrashing_since = None
+        self.thrashing_references = 0
+        self.episodes = []  # (first step, last step, peak total working set) while thrashing
+
+    def _process(self, pid):
+        policy = self.policies.get(pid)
+        if policy is None:
+            policy = self.policies[pid] = create_policy(self.algorithm, self.num_frames)
+            policy.memory_manager = self.memory_manager
+            for name, value in self.shared.items():
+                setattr(policy, name, value)
+            self.quota.setdefault(pid, 1)
+            policy.resize(self.quota[pid])
+            self.pages[pid] = set()
+            self.references[pid] = 0
+            self.faults[pid] = 0
+            self.windows[pid] = OrderedDict()
+            self.expired[pid] = []
+            self.used[pid] = set()
+            self.last_fault[pid] = 0
+        return policy
+
+    def prepare(self, sequence, page_size):
+        template = create_policy(self.algorithm, self.num_frames)
+        template.prepare(sequence, page_size)
+        self.share_trace({name: getattr(template, name) for name in template.trace_attributes})
+
+    def share_trace(self, shared):
+        self.shared = shared
+        for policy in self.policies.values():
+            for name, value in shared.items():
+                setattr(policy, name, value)
+
+    def adopt_trace(self, other):
+        self.share_trace(other.shared)
+
+    def _touch(self, pid, page_num, step):
+        # One reference in pid's virtual time: slides its working-set window
+        # and updates the thrashing state
+        now = self.references[pid] = self.references[pid] + 1
+        window = self.windows[pid]
+        if page_num in window:
+            window.move_to_end(page_num)
+        else:
+            self.working_set_total += 1
+        window[page_num] = now
+        horizon = now - self.window
+        while True:
+            oldest, last = next(iter(window.items()))
+            if last > horizon:
+                break
+            del window[oldest]
+            self.working_set_total -= 1
+            if self.controller == "working-set":
+                self.expired[pid].append(oldest)
+        if self.controller == "pff":
+            self.used[pid].add(page_num)
+        total = self.working_set_total
+        if total > self.peak_working_set:
+            self.peak_working_set = total
+        if total > self.num_frames:
+            self.thrashing_references += 1
+            if self.thrashing_since is None:
+                self.thrashing_since = step
+                self.episodes.append([step, step, total])
+            episode = self.episodes[-1]
+            episode[1] = step
+            episode[2] = max(episode[2], total)
+        else:
+            self.thrashing_since = None
+
+    def on_access(self, key, step):
+        self._touch(key[0], key[1], step)
+        self.policies[key[0]].on_access(key, step)
+
+    def trim(self, key, step):
+        pid, page_num = key
+        self._process(pid)
+        self.faults[pid] += 1
+        released = []
+        pages = self.pages[pid]
+        if self.controller == "pff":
+            interval = self.references[pid] + 1 - self.last_fault[pid]
+            if interval <= self.pff_interval:
+                self.quota[pid] = min(self.quota[pid] + 1, self.num_frames)
+            else:
+                released = [page for page in pages if page not in self.used[pid]]
+                self.quota[pid] = max(1, len(pages) - len(released) + 1)
+            self.used[pid] = set()
+            self.last_fault[pid] = self.references[pid] + 1
+        self._touch(pid, page_num, step)
+        if self.controller == "working-set":
+            window = self.windows[pid]
+            released = [page for page in self.expired[pid] if page in pages and page not in window]
+            self.expired[pid] = []
+            self.quota[pid] = max(1, len(window))
+        policy = self.policies[pid]
+        if self.controller is not None:
+            policy.resize(self.quota[pid])
+        for page in released:
+            pages.discard(page)
+            policy.remove((pid, page))
+        return [(pid, page) for page in released]
+
+    def must_replace(self, key):
+        pages = self.pages[key[0]]
+        return bool(pages) and len(pages) >= self.quota[key[0]]
+
+    def choose_victim(self, key, step):
+        # The faulting process replaces its own page once it has filled its
+        # allocation; otherwise the process furthest over its own gives one up
+        pid = key[0]
+        target = pid
+        if len(self.pages[pid]) < self.quota[pid] or not self.pages[pid]:
+            others = [other for other in self.pages if other != pid and self.pages[other]]
+            if others:
+                target = max(others, key=lambda other: len(self.pages[other]) - self.quota[other])
+        if target == pid:
+            victim = self.policies[pid].choose_victim(key, step)
+        else:
+            victim = self.policies[target].yield_victim(key, step)
+        self.pages[target].discard(victim[1])
+        return victim
+
+    def on_fault(self, key, step):
+        self.pages[key[0]].add(key[1])
+        self.policies[key[0]].on_fault(key, step)
+
+    def remove(self, key):
+        if key[0] in self.pages:
+            self.pages[key[0]].discard(key[1])
+            self.policies[key[0]].remove(key)
+
+    def resident_sets(self):
+        return [{"pid": pid, "allocation": self.quota[pid], "resident": len(self.pages[pid]),
+                 "working_set": len(self.windows[pid]), "references": self.references[pid],
+                 "faults": self.faults[pid],
+                 "fault_rate": self.faults[pid] / self.references[pid] if self.references[pid] else 0}
+                for pid in self.policies]
+
+    def stats(self):
+        return {
+            "working_set_total": self.working_set_total,
+            "peak_working_set": self.peak_working_set,
+            "thrashing": self.thrashing_since is not None,
+            "thrashing_episodes": len(self.episodes),
+            "thrashing_references": self.thrashing_references,
+        }
+
+
+def parse_weights(text):
+    weights = {}
+    for item in text.split(","):
+        if "=" not in item:
+            raise argparse.ArgumentTypeError("Priorities must be given as PID=PRIORITY,...")
+        pid, weight = item.split("=", 1)
+        weights[pid.strip()] = float(weight)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a trace with per-process frame allocation and report "
+                                                 "resident sets, working sets and thrashing.")
+    add_trace_arguments(parser)
+    add_system_arguments(parser)
+    parser.add_argument("--allocation", default="equal", choices=ALLOCATIONS)
+    parser.add_argument("--priority", type=parse_weights, help="priorities as PID=PRIORITY,... for --allocation priority")
+    parser.add_argument("--controller", choices=CONTROLLERS, help="resize allocations dynamically")
+    parser.add_argument("--window", type=int, default=WORKING_SET_WINDOW, help="working-set window in references")
+    parser.add_argument("--pff-interval", type=int, default=PFF_INTERVAL,
+                        help="PFF grows the allocation on faults closer together than this many references")
+    add_output_argument(parser, "per-process CSV")
+    args = parser.parse_args(argv)
+
+    engine = build_engine(args, allocation={
+        "allocation": args.allocation, "priorities": args.priority, "controller": args.controller,
+        "window": args.window, "pff_interval": args.pff_interval})
+    stats = replay(engine, args.trace)
+
+    write_csv(engine.policy.resident_sets(), RESIDENT_SET_FIELDS, args.output)
+    print(f"{stats['page_faults']} faults in {stats['references']} references; peak total working set "
+          f"{stats['peak_working_set']} of {args.frames} frames.", file=sys.stderr)
+    for first, last, peak in engine.policy.episodes:
+        print(f"Thrashing from step {first} to {last}: working sets need {peak} frames.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+
+from algorithms import POLICIES, available_policies
+from cli import parse_names
+from engine import SimulationEngine
+from memory_manager import MemoryManager
+from process import Process
+from workloads import WorkloadProcess, generate_chunks
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then not reported
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SCALES = {"small": 10 ** 4, "medium": 10 ** 5, "large": 10 ** 6}
+BENCH_FRAMES = 256
+BENCH_PAGE_SIZE = 4096
+BENCH_TLB_SIZE = 16
+BENCH_SEED = 1
+
+# Standard traces: (processes, quantum)
+STANDARD_WORKLOADS = {
+    "zipf": ([WorkloadProcess("P1", 1 << 26, "Zipf", alpha=1.0),
+              WorkloadProcess("P2", 1 << 24, "Zipf", alpha=0.8)], 100),
+    "loop": ([WorkloadProcess("P1", 1 << 22, "Loop", length=300)], 1),
+    "phase": ([WorkloadProcess("P1", 1 << 28, "WorkingSet", window=128, phase=20000, locality=0.95),
+               WorkloadProcess("P2", 1 << 28, "WorkingSet", window=64, phase=5000, locality=0.9)], 1000),
+    "scan": ([WorkloadProcess("P1", 1 << 26, "Scan"),
+              WorkloadProcess("P2", 1 << 20, "Uniform")], 10),
+}
+CASE_FIELDS = ("workload", "policy", "scale", "mode")
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def build_engine(workload, policy):
+    processes, _ = STANDARD_WORKLOADS[workload]
+    memory_manager = MemoryManager(BENCH_FRAMES * BENCH_PAGE_SIZE, BENCH_PAGE_SIZE, BENCH_TLB_SIZE)
+    simulated = {p.pid: Process(p.pid, p.size, BENCH_PAGE_SIZE) for p in processes}
+    return SimulationEngine(memory_manager, simulated, policy)
+
+
+def run_case(case, repeat=1):
+    # Runs in its own worker process so the peak RSS belongs to this case.
+    # The trace is generated before the clock starts; the best of repeat
+    # runs is kept.
+    processes, quantum = STANDARD_WORKLOADS[case["workload"]]
+    references = SCALES[case["scale"]]
+    chunks = list(generate_chunks(processes, references, BENCH_SEED, BENCH_PAGE_SIZE, quantum))
+    sequence = None
+    if case["mode"] == "step" or POLICIES[case["policy"]].needs_future:
+        sequence = [pair for pids, vas, _ in chunks
+                    for pair in zip(pids, vas if isinstance(vas, list) else vas.tolist())]
+    best = None
+    for _ in range(repeat):
+        engine = build_engine(case["workload"], case["policy"])
+        start = time.perf_counter()
+        if case["mode"] == "step":
+            # The GUI path: one engine.step() per reference
+            engine.load(sequence)
+            while not engine.finished():
+                engine.step()
+            stats = engine.get_stats()
+        elif engine.policy.needs_future:
+            stats = engine.run(sequence)
+        else:
+            stats = engine.run_chunks(chunks)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    result = dict(case)
+    result.update({
+        "references": references,
+        "seconds": best,
+        "refs_per_sec": references / best if best else 0,
+        "us_per_ref": best / references * 1e6,
+        "page_faults": stats["page_faults"],
+        "tlb_hits": stats["tlb_hits"],
+        "peak_rss_kb": peak_rss_kb(),
+    })
+    return result
+
+
+def run_benchmarks(cases, repeat=1, report=None):
+    results = []
+    context = multiprocessing.get_context()
+    for case in cases:
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(run_case, (case, repeat))
+        if report:
+            report(result)
+        results.append(result)
+    return results
+
+
+def build_cases(workloads, policies, scales, modes=("run",)):
+    return [{"workload": workload, "policy": policy, "scale": scale, "mode": mode}
+            for workload in workloads for scale in scales for mode in modes for policy in policies]
+
+
+def environment():
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "machine": platform.machine(), "numpy": np.__version__ if np is not None else None}
+
+
+def case_key(result):
+    return tuple(result[field] for field in CASE_FIELDS)
+
+
+def compare(baseline, results, threshold):
+    # Returns (rows, regressions). A case regresses when its throughput drops
+    # by more than threshold (a fraction) against the baseline. Fault counts
+    # are compared too, since the traces are deterministic.
+    old = {case_key(result): result for result in baseline["results"]}
+    rows = []
+    regressions = []
+    for result in results:
+        before = old.get(case_key(result))
+        if before is None:
+            continue
+        change = result["refs_per_sec"] / before["refs_per_sec"] - 1 if before["refs_per_sec"] else 0
+        status = "ok"
+        if result["page_faults"] != before["page_faults"]:
+            status = "CHANGED FAULTS"
+            regressions.append(result)
+        elif change < -threshold:
+            status = "REGRESSION"
+            regressions.append(result)
+        elif change > threshold:
+            status = "faster"
+        rows.append((result, before, change, status))
+    return rows, regressions
+
+
+def format_result(result):
+    rss = f"{result['peak_rss_kb'] / 1024:.1f} MiB" if result["peak_rss_kb"] is not None else "n/a"
+    return (f"{result['workload']:<6} {result['policy']:<14} {result['scale']:<6} {result['mode']:<4} "
+            f"{result['refs_per_sec']:>12,.0f} refs/s {result['us_per_ref']:>8.2f} us/ref  "
+            f"faults {result['page_faults']:>8}  peak {rss}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation engine on standard synthetic traces.")
+    parser.add_argument("--workload", default=",".join(STANDARD_WORKLOADS),
+                        type=lambda text: parse_names(text, STANDARD_WORKLOADS, "workload"),
+                        help="comma-separated standard workloads (default: all)")
+    parser.add_argument("--policy", default=",".join(available_policies()),
+                        type=lambda text: parse_names(text, available_policies(), "algorithm"),
+                        help="comma-separated policies (default: all)")
+    parser.add_argument("--scale", default="small,medium", type=lambda text: parse_names(text, SCALES, "scale"),
+                        help=f"comma-separated scales from {', '.join(f'{k}={v}' for k, v in SCALES.items())}")
+    parser.add_argument("--mode", default="run", type=lambda text: parse_names(text, ("run", "step"), "mode"),
+                        help="run (batched engine.run_chunks) and/or step (one engine.step per reference)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is kept")
+    parser.add_argument("-o", "--output", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="rerun the cases of a JSON baseline and compare")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="throughput drop that counts as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        cases = [{field: result[field] for field in CASE_FIELDS} for result in baseline["results"]]
+    else:
+        baseline = None
+        cases = build_cases(args.workload, args.policy, args.scale, args.mode)
+
+    results = run_benchmarks(cases, args.repeat, None if baseline else lambda result: print(format_result(result)))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if baseline is not None:
+        rows, regressions = compare(baseline, results, args.threshold)
+        for result, before, change, status in rows:
+            print(f"{format_result(result)}  {change:+7.1%} vs {before['refs_per_sec']:,.0f}  {status}")
+        if baseline.get("environment") != environment():
+            print("Note: the baseline was recorded in a different environment.", file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} of {len(rows)} cases regressed beyond {args.threshold:.0%}.", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
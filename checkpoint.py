@@ -0,0 +1,108 @@
+import pickle
+import struct
+import zlib
+
+# Checkpoint file layout: magic, version byte, uint32 interval, uint32
+# count, then per checkpoint (uint64 step, uint32 length, snapshot bytes).
+CHECKPOINT_MAGIC = b"VMCK"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 10000
+MAX_CHECKPOINTS = 64
+
+
+def snapshot(engine):
+    # The whole engine state minus the trace and any attached sinks, as a
+    # zlib-compressed pickle; frame and page tables pickle as raw arrays
+    return zlib.compress(pickle.dumps(engine, pickle.HIGHEST_PROTOCOL), 6)
+
+
+def restore(data, sequence, like=None):
+    # Rebuilds an engine from snapshot(). Trace-derived policy state (such as
+    # Optimal's next-use table) is shared with like, an engine over the same
+    # sequence, when given, and recomputed otherwise.
+    engine = pickle.loads(zlib.decompress(data))
+    engine.sequence = sequence
+    policy = engine.policy
+    if policy.trace_attributes:
+        if like is not None and like.policy.name == policy.name:
+            policy.adopt_trace(like.policy)
+        else:
+            policy.prepare(sequence, engine.memory_manager.page_size)
+    return engine
+
+
+class Checkpointer:
+    # Keeps snapshots of one run, taken whenever advance() crosses a multiple
+    # of interval steps. When more than max_checkpoints pile up, every other
+    # one is dropped and the interval doubles, so memory stays bounded on
+    # arbitrarily long traces.
+    def __init__(self, interval=CHECKPOINT_INTERVAL, max_checkpoints=MAX_CHECKPOINTS):
+        if interval < 1 or max_checkpoints < 2:
+            raise ValueError("Checkpoints need a positive interval and room for at least two snapshots.")
+        self.interval = interval
+        self.max_checkpoints = max_checkpoints
+        self.checkpoints = {}  # step -> snapshot bytes
+
+    def save(self, engine):
+        self.checkpoints[engine.current_step] = snapshot(engine)
+        if len(self.checkpoints) > self.max_checkpoints:
+            self.interval *= 2
+            for step in [step for step in self.checkpoints if step % self.interval]:
+                del self.checkpoints[step]
+
+    def record(self, engine):
+        # Call after stepping the engine by other means
+        step = engine.current_step
+        if step % self.interval == 0 and step not in self.checkpoints:
+            self.save(engine)
+
+    def advance(self, engine, count):
+        # engine.run_steps(count), stopping at each interval boundary to save
+        done = 0
+        while done < count and not engine.finished():
+            to_boundary = self.interval - engine.current_step % self.interval
+            ran = engine.run_steps(min(count - done, to_boundary))
+            done += ran
+            self.record(engine)
+        return done
+
+    def nearest(self, step):
+        earlier = [saved for saved in self.checkpoints if saved <= step]
+        return max(earlier) if earlier else None
+
+    def seek(self, engine, target):
+        # Returns an engine at step target: engine itself moved forward when
+        # no later checkpoint is closer, otherwise a restored copy replayed
+        # from the nearest checkpoint at or before target
+        target = max(0, min(target, len(engine.sequence)))
+        start = self.nearest(target)
+        if start is not None and not start <= engine.current_step <= target:
+            engine = restore(self.checkpoints[start], engine.sequence, like=engine)
+        elif engine.current_step > target:
+            raise ValueError(f"No checkpoint at or before step {target}.")
+        self.advance(engine, target - engine.current_step)
+        return engine
+
+    def write(self, path):
+        with open(path, "wb") as out:
+            out.write(CHECKPOINT_MAGIC + bytes([CHECKPOINT_VERSION]))
+            out.write(struct.pack("<II", self.interval, len(self.checkpoints)))
+            for step in sorted(self.checkpoints):
+                data = self.checkpoints[step]
+                out.write(struct.pack("<QI", step, len(data)))
+                out.write(data)
+
+    @classmethod
+    def read(cls, path, max_checkpoints=MAX_CHECKPOINTS):
+        with open(path, "rb") as f:
+            if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+                raise ValueError("Not a checkpoint file.")
+            version = f.read(1)
+            if not version or version[0] != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version: {version[0] if version else None}")
+            interval, count = struct.unpack("<II", f.read(8))
+            checkpointer = cls(interval, max(max_checkpoints, count, 2))
+            for _ in range(count):
+                step, length = struct.unpack("<QI", f.read(12))
+                checkpointer.checkpoints[step] = f.read(length)
+        return checkpointer
@@ -0,0 +1,78 @@
+import argparse
+import contextlib
+import csv
+import sys
+
+from memory_manager import MemoryManager
+from process import Process
+from trace_loader import open_trace, validate_trace
+
+# Argument parsing and engine building shared by the command-line tools
+
+
+def parse_int_list(text):
+    return [int(item) for item in text.split(",") if item.strip()]
+
+
+def parse_process(text):
+    if "=" not in text:
+        raise argparse.ArgumentTypeError("Processes must be given as PID=SIZE.")
+    pid, size = text.split("=", 1)
+    return pid.strip(), int(size)
+
+
+def parse_names(text, known, kind):
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    for name in names:
+        if name not in known:
+            raise argparse.ArgumentTypeError(f"Unknown {kind}: {name}")
+    return names
+
+
+def add_trace_arguments(parser, trace_help="address trace file (text, CSV or binary, optionally .gz)"):
+    parser.add_argument("trace", help=trace_help)
+    parser.add_argument("-p", "--process", type=parse_process, action="append", required=True,
+                        help="process as PID=SIZE, repeat for each process")
+
+
+def add_system_arguments(parser, policy="LRU", tlb=4, frames_help="number of physical frames"):
+    # One memory configuration, as build_engine() expects
+    parser.add_argument("--frames", type=int, required=True, help=frames_help)
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--tlb", type=int, default=tlb, help="TLB size")
+    parser.add_argument("--policy", default=policy)
+
+
+def add_output_argument(parser, what="results CSV"):
+    parser.add_argument("-o", "--output", default="-", help=f"{what} (default: stdout)")
+
+
+def build_processes(args):
+    return {pid: Process(pid, size, args.page_size) for pid, size in args.process}
+
+
+def build_engine(args, memory_manager=None, engine_class=None, **options):
+    # engine imports modules that use this one, so it is imported late
+    from engine import SimulationEngine
+
+    if memory_manager is None:
+        memory_manager = MemoryManager(args.frames * args.page_size, args.page_size, args.tlb)
+    return (engine_class or SimulationEngine)(memory_manager, build_processes(args), args.policy, **options)
+
+
+def replay(engine, trace_path):
+    return engine.run(validate_trace(open_trace(trace_path), engine.processes))
+
+
+def open_output(path):
+    # "-" is stdout, which is left open
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", newline="")
+
+
+def write_csv(rows, fields, path):
+    with open_output(path) as out:
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
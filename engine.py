@@ -0,0 +1,301 @@
+from itertools import islice
+from process import Process, split_addresses
+from memory_manager import MemoryManager
+from algorithms import create_policy
+from allocation import LocalReplacementPolicy
+from page_tables import REFERENCED, DIRTY
+from trace_loader import READ, EXECUTE, iter_trace_chunks, chunk_accesses
+from events import (EventStream, TLB_HIT_EVENT, TLB_MISS_EVENT, PAGE_TABLE_HIT_EVENT, PAGE_FAULT_EVENT, EVICTION_EVENT,
+                    WRITEBACK_EVENT, PAGE_WALK_EVENT, PREFETCH_EVENT)
+from latency import LatencyModel
+
+# Outcome codes returned by SimulationEngine.access()
+TLB_HIT = 0
+PAGE_TABLE_HIT = 1
+PAGE_FAULT = 2
+
+# Page-table bits set by a read, a write and an instruction fetch
+ACCESS_FLAGS = (REFERENCED, REFERENCED | DIRTY, REFERENCED)
+
+
+class SimulationEngine:
+    def __init__(self, memory_manager, processes, algorithm="FIFO", latency=None, allocation=None, prefetcher=None):
+        # allocation holds LocalReplacementPolicy options; without it every
+        # process competes for frames under one global policy. prefetcher
+        # loads predicted pages along with each fault.
+        self.memory_manager = memory_manager
+        self.processes = processes
+        self.algorithm = algorithm
+        if allocation is None:
+            self.policy = create_policy(algorithm, memory_manager.num_frames)
+        else:
+            self.policy = LocalReplacementPolicy(memory_manager.num_frames, algorithm, processes, **allocation)
+        self.policy.memory_manager = memory_manager
+        self.latency = latency or LatencyModel()
+        if prefetcher is not None and self.policy.needs_future:
+            raise ValueError(f"{algorithm} needs the whole trace and cannot be combined with prefetching.")
+        self.prefetcher = prefetcher
+        self.prefetched = set()  # prefetched pages not referenced yet
+        self.displaced = set()  # pages evicted to make room for prefetches, until they fault again
+        self.prefetches = 0
+        self.prefetch_hits = 0
+        self.prefetch_evictions = 0
+        self.wasted_prefetches = 0
+        self.pollution_faults = 0
+        for process in processes.values():
+            memory_manager.register_process(process)
+        self.sequence = []
+        self.current_step = 0
+        self.page_faults = 0
+        self.hits = 0
+        self.page_walks = 0
+        self.page_walk_accesses = 0
+        self.access_counts = [0, 0, 0]  # reads, writes, instruction fetches
+        self.events = None  # EventStream once a sink is attached
+
+    def __getstate__(self):
+        # Checkpoints leave out the trace and any attached sinks
+        state = self.__dict__.copy()
+        state["sequence"] = []
+        state["events"] = None
+        return state
+
+    def attach(self, sink):
+        if self.events is None:
+            self.events = EventStream()
+        self.events.add(sink)
+
+    def close_events(self):
+        if self.events is not None:
+            self.events.close()
+
+    def load(self, sequence):
+        self.sequence = sequence if isinstance(sequence, list) else list(sequence)
+        self.current_step = 0
+        if self.policy.needs_future:
+            self.policy.prepare(self.sequence, self.memory_manager.page_size)
+
+    def finished(self):
+        return self.current_step >= len(self.sequence)
+
+    def access(self, pid, addr, access=READ):
+        process = self.processes[pid]
+        return self.access_page(process, process.get_page_number(addr), access)
+
+    def access_page(self, process, page_num, access=READ):
+        pid = process.pid
+        mm = self.memory_manager
+        events = self.events
+        instruction = access == EXECUTE
+        self.access_counts[access] += 1
+        process.page_table.mark(page_num, ACCESS_FLAGS[access])
+
+        frame = mm.check_tlb(pid, page_num, instruction)
+        if frame is not None:
+            self.hits += 1
+            if self.prefetched:
+                self.used_prefetch(pid, page_num)
+            self.policy.on_access((pid, page_num), self.current_step)
+            if events is not None:
+                events.emit(self.current_step, TLB_HIT_EVENT, pid, page_num, frame)
+            return TLB_HIT, frame
+
+        frame, walk_accesses = process.page_table.walk(page_num)
+        self.page_walks += 1
+        self.page_walk_accesses += walk_accesses
+        if events is not None:
+            events.emit(self.current_step, TLB_MISS_EVENT, pid, page_num)
+            events.emit(self.current_step, PAGE_WALK_EVENT, pid, page_num, frame, walk_accesses)
+        if frame != -1:
+            self.hits += 1
+            if self.prefetched:
+                self.used_prefetch(pid, page_num)
+            self.policy.on_access((pid, page_num), self.current_step)
+            mm.update_tlb(pid, page_num, frame, instruction)
+            if events is not None:
+                events.emit(self.current_step, PAGE_TABLE_HIT_EVENT, pid, page_num, frame)
+            return PAGE_TABLE_HIT, frame
+
+        self.page_faults += 1
+        frame = self.handle_page_fault(process, page_num, instruction)
+        if events is not None:
+            events.emit(self.current_step, PAGE_FAULT_EVENT, pid, page_num, frame)
+        return PAGE_FAULT, frame
+
+    def handle_page_fault(self, process, page_num, instruction=False):
+        mm = self.memory_manager
+        pid = process.pid
+        key = (pid, page_num)
+        for released in self.policy.trim(key, self.current_step):
+            mm.free_frames.append(self.evict(released, "resident-set"))
+        if self.prefetcher is not None:
+            if key in self.displaced:
+                self.displaced.discard(key)
+                self.pollution_faults += 1
+            self.prefetch(process, page_num)
+        if mm.free_frames and not self.policy.must_replace(key):
+            frame = mm.free_frames.pop()
+        else:
+            frame = self.evict(self.policy.choose_victim(key, self.current_step), self.algorithm)
+        mm.map_page(frame, process, page_num)
+        mm.update_tlb(pid, page_num, frame, instruction)
+        self.policy.on_fault(key, self.current_step)
+        return frame
+
+    def prefetch(self, process, page_num):
+        # Loads the predicted pages in the same batch as a faulting page,
+        # before it, so their evictions never pick the page being faulted in.
+        # Victims are remembered to count the faults prefetching causes.
+        mm = self.memory_manager
+        pid = process.pid
+        page_table = process.page_table
+        self.prefetcher.observe(pid, page_num)
+        room = mm.num_frames - 1
+        for page in self.prefetcher.predict(pid, page_num):
+            if room <= 0:
+                break
+            if not 0 <= page < process.num_pages or page == page_num or page_table[page] != -1:
+                continue
+            key = (pid, page)
+            if mm.free_frames and not self.policy.must_replace(key):
+                frame = mm.free_frames.pop()
+            else:
+                victim = self.policy.choose_victim(key, self.current_step)
+                frame = self.evict(victim, "prefetch")
+                self.prefetch_evictions += 1
+                self.displaced.add(victim)
+            mm.map_page(frame, process, page)
+            self.policy.on_fault(key, self.current_step)
+            self.prefetched.add(key)
+            self.displaced.discard(key)
+            self.prefetches += 1
+            room -= 1
+            if self.events is not None:
+                self.events.emit(self.current_step, PREFETCH_EVENT, pid, page, frame, page_num)
+
+    def used_prefetch(self, pid, page_num):
+        key = (pid, page_num)
+        if key in self.prefetched:
+            self.prefetched.discard(key)
+            self.prefetch_hits += 1
+            self.prefetcher.observe(pid, page_num)
+
+    def evict(self, victim, reason):
+        # Unmaps a page the policy has already let go of; returns its frame
+        mm = self.memory_manager
+        frame = mm.frame_index[victim]
+        dirty = mm.unmap_frame(frame)[2]
+        if victim in self.prefetched:
+            self.prefetched.discard(victim)
+            self.wasted_prefetches += 1
+        if self.events is not None:
+            self.events.emit(self.current_step, EVICTION_EVENT, victim[0], victim[1], frame, reason)
+            if dirty:
+                self.events.emit(self.current_step, WRITEBACK_EVENT, victim[0], victim[1], frame)
+        return frame
+
+    def step(self):
+        item = self.sequence[self.current_step]
+        result = self.access(item[0], item[1], item[2] if len(item) > 2 else READ)
+        self.current_step += 1
+        return result
+
+    def run_steps(self, count):
+        # Advances up to count steps through the loaded sequence
+        sequence = self.sequence
+        start = self.current_step
+        end = min(start + count, len(sequence))
+        access = self.access
+        for i in range(start, end):
+            item = sequence[i]
+            access(item[0], item[1], item[2] if len(item) > 2 else READ)
+            self.current_step += 1
+        return end - start
+
+    def run(self, sequence=None):
+        # Any iterable of (pid, va[, access]) is consumed as a stream, except for
+        # policies that need to see the whole trace up front
+        if sequence is None:
+            trace = islice(self.sequence, self.current_step, None)
+        elif self.policy.needs_future:
+            self.load(sequence)
+            trace = self.sequence
+        else:
+            trace = sequence
+        return self.run_chunks(iter_trace_chunks(trace))
+
+    def run_chunks(self, chunks):
+        # chunks yields (pids, vas[, accesses]); page numbers are split off a
+        # whole chunk at a time
+        access_page = self.access_page
+        processes = self.processes
+        page_size = self.memory_manager.page_size
+        for chunk in chunks:
+            pids = chunk[0]
+            pages = split_addresses(chunk[1], page_size)[0]
+            if not isinstance(pages, list):
+                pages = pages.tolist()
+            accesses = chunk_accesses(chunk)
+            if accesses is None:
+                for pid, page_num in zip(pids, pages):
+                    access_page(processes[pid], page_num)
+                    self.current_step += 1
+            else:
+                for pid, page_num, access in zip(pids, pages, accesses):
+                    access_page(processes[pid], page_num, access)
+                    self.current_step += 1
+        return self.get_stats()
+
+    def get_stats(self):
+        mm = self.memory_manager
+        lookups = mm.tlb_hits + mm.tlb_misses
+        stats = {
+            "references": self.current_step,
+            "reads": self.access_counts[0],
+            "writes": self.access_counts[1],
+            "instruction_fetches": self.access_counts[2],
+            "page_faults": self.page_faults,
+            "writebacks": mm.writebacks,
+            "hits": self.hits,
+            "tlb_hits": mm.tlb_hits,
+            "tlb_misses": mm.tlb_misses,
+            "tlb_shootdowns": mm.tlb_shootdowns,
+            "tlb_hit_ratio": (mm.tlb_hits / lookups * 100) if lookups > 0 else 0,
+            "page_walks": self.page_walks,
+            "page_walk_accesses": self.page_walk_accesses,
+            "page_table_entries": sum(p.page_table.table_entries() for p in self.processes.values()),
+            **mm.tlb_stats(),
+            "memory_utilization": mm.get_memory_utilization(),
+            **self.policy.stats(),
+        }
+        if self.prefetcher is not None:
+            stats.update(self.prefetch_stats())
+        stats.update(self.latency.cost(stats))
+        return stats
+
+    def prefetch_stats(self):
+        # Accuracy: prefetched pages that were used. Coverage: misses that
+        # prefetching turned into hits. Pollution: demand faults on pages a
+        # prefetch had evicted.
+        misses = self.prefetch_hits + self.page_faults
+        return {
+            "prefetches": self.prefetches,
+            "prefetch_hits": self.prefetch_hits,
+            "prefetch_accuracy": self.prefetch_hits / self.prefetches * 100 if self.prefetches else 0,
+            "prefetch_coverage": self.prefetch_hits / misses * 100 if misses else 0,
+            "prefetch_evictions": self.prefetch_evictions,
+            "wasted_prefetches": self.wasted_prefetches,
+            "pollution_faults": self.pollution_faults,
+        }
+
+
+def run_simulation(memory_size, page_size, process_sizes, sequence, algorithm="FIFO", tlb_size=4, page_table="Flat",
+                   tlb_config=None, sinks=(), latency=None, allocation=None, prefetcher=None):
+    processes = {pid: Process(pid, size, page_size, page_table) for pid, size in process_sizes.items()}
+    memory_manager = MemoryManager(memory_size, page_size, tlb_size, tlb_config)
+    engine = SimulationEngine(memory_manager, processes, algorithm, latency, allocation, prefetcher)
+    for sink in sinks:
+        engine.attach(sink)
+    stats = engine.run(sequence)
+    engine.close_events()
+    return stats
@@ -0,0 +1,179 @@
+import argparse
+import csv
+import json
+from collections import Counter, namedtuple
+
+from cli import add_system_arguments, add_trace_arguments, build_engine, open_output, replay
+
+# Event kinds emitted by SimulationEngine
+TLB_HIT_EVENT = "tlb_hit"
+TLB_MISS_EVENT = "tlb_miss"
+PAGE_TABLE_HIT_EVENT = "page_table_hit"
+PAGE_FAULT_EVENT = "page_fault"
+EVICTION_EVENT = "eviction"
+WRITEBACK_EVENT = "writeback"
+PREFETCH_EVENT = "prefetch"
+PAGE_WALK_EVENT = "page_walk"
+PROMOTION_EVENT = "promote"
+DEMOTION_EVENT = "demote"
+REFERENCE_KINDS = (TLB_HIT_EVENT, PAGE_TABLE_HIT_EVENT, PAGE_FAULT_EVENT)  # exactly one per reference
+
+# detail holds the walk depth for page_walk, the reason for eviction, the
+# faulting page for prefetch and the base pages kept for demote. A promote or
+# demote event carries the first page and first frame of the huge page.
+Event = namedtuple("Event", ["step", "kind", "pid", "page", "frame", "detail"])
+EVENT_FIELDS = list(Event._fields)
+
+
+class EventStream:
+    # Fans events out to sinks. The engine holds None instead of a stream
+    # when nothing is attached, so a disabled stream costs one None check
+    # per event site.
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def add(self, sink):
+        self.sinks.append(sink)
+
+    def emit(self, step, kind, pid, page, frame=-1, detail=None):
+        event = Event(step, kind, pid, page, frame, detail)
+        for sink in self.sinks:
+            sink.handle(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class EventSink:
+    def handle(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileSink(EventSink):
+    # Accepts a path (opened and closed by the sink) or an open text file
+    def __init__(self, out, kinds=None):
+        self.owns_file = isinstance(out, str)
+        self.out = open(out, "w", newline="", encoding="utf-8") if self.owns_file else out
+        self.kinds = set(kinds) if kinds else None
+
+    def close(self):
+        if self.owns_file:
+            self.out.close()
+        else:
+            self.out.flush()
+
+
+class CSVSink(FileSink):
+    def __init__(self, out, kinds=None):
+        super().__init__(out, kinds)
+        self.writer = csv.writer(self.out)
+        self.writer.writerow(EVENT_FIELDS)
+
+    def handle(self, event):
+        if self.kinds is None or event.kind in self.kinds:
+            self.writer.writerow(event)
+
+
+class JSONLinesSink(FileSink):
+    def handle(self, event):
+        if self.kinds is None or event.kind in self.kinds:
+            self.out.write(json.dumps(event._asdict()) + "\n")
+
+
+class AggregatorSink(EventSink):
+    # Keeps totals per kind, page-walk depth and eviction reason histograms,
+    # and a series with one row per window of references: faults, fault
+    # rate and working-set size (distinct pages referenced in the window).
+    def __init__(self, window=1000):
+        if window < 1:
+            raise ValueError("Aggregation window must be a positive number of references.")
+        self.window = window
+        self.totals = Counter()
+        self.walk_depths = Counter()
+        self.eviction_reasons = Counter()
+        self.rows = []
+        self.window_start = 0
+        self.references = 0
+        self.faults = 0
+        self.pages = set()
+
+    def handle(self, event):
+        kind = event.kind
+        self.totals[kind] += 1
+        if kind in REFERENCE_KINDS:
+            if self.references == self.window:
+                self.flush()
+            if self.references == 0:
+                self.window_start = event.step
+            self.references += 1
+            self.pages.add((event.pid, event.page))
+            if kind == PAGE_FAULT_EVENT:
+                self.faults += 1
+        elif kind == PAGE_WALK_EVENT:
+            self.walk_depths[event.detail] += 1
+        elif kind == EVICTION_EVENT:
+            self.eviction_reasons[event.detail] += 1
+
+    def window_row(self):
+        return {"step": self.window_start, "references": self.references, "faults": self.faults,
+                "fault_rate": self.faults / self.references, "working_set": len(self.pages)}
+
+    def flush(self):
+        if self.references:
+            self.rows.append(self.window_row())
+        self.references = 0
+        self.faults = 0
+        self.pages = set()
+
+    def close(self):
+        self.flush()
+
+    def series(self):
+        # Completed windows plus the one in progress
+        return self.rows + [self.window_row()] if self.references else list(self.rows)
+
+    def summary(self):
+        walks = sum(self.walk_depths.values())
+        return {
+            "events": dict(self.totals),
+            "mean_walk_depth": sum(depth * n for depth, n in self.walk_depths.items()) / walks if walks else 0,
+            "walk_depths": dict(self.walk_depths),
+            "eviction_reasons": dict(self.eviction_reasons),
+        }
+
+
+def write_series(rows, out):
+    writer = csv.DictWriter(out, fieldnames=["step", "references", "faults", "fault_rate", "working_set"])
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a trace and record its event stream and time series.")
+    add_trace_arguments(parser)
+    add_system_arguments(parser, policy="FIFO")
+    parser.add_argument("--events", help="event log, .csv for CSV, otherwise JSON lines")
+    parser.add_argument("--kinds", help="comma-separated event kinds to log (default: all)")
+    parser.add_argument("--window", type=int, default=1000, help="references per series window")
+    parser.add_argument("--series", default="-", help="windowed series CSV (default: stdout)")
+    args = parser.parse_args(argv)
+
+    engine = build_engine(args)
+    aggregator = AggregatorSink(args.window)
+    engine.attach(aggregator)
+    if args.events:
+        kinds = [kind.strip() for kind in args.kinds.split(",")] if args.kinds else None
+        engine.attach((CSVSink if args.events.endswith(".csv") else JSONLinesSink)(args.events, kinds))
+    replay(engine, args.trace)
+    engine.close_events()
+
+    with open_output(args.series) as out:
+        write_series(aggregator.series(), out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from simulator import VirtualMemorySimulator
+from algorithms import available_policies
+from page_tables import available_page_tables
+from views import VirtualListView
 
 
 class VirtualMemorySimulatorGUI:
@@ -96,20 +99,38 @@ class VirtualMemorySimulatorGUI:
         ttk.Label(self.input_frame, text="Display Page Table:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
         self.pid_menu = ttk.Combobox(self.input_frame, textvariable=self.simulator.selected_pid, state="readonly")
         self.pid_menu.grid(row=5, column=1, padx=5, pady=5, sticky="w")
-        self.pid_menu.bind("<<ComboboxSelected>>", lambda event: self.simulator.update_displays())
+        self.pid_menu.bind("<<ComboboxSelected>>", lambda event: self.simulator.draw_page_table())
 
         # Address Sequence
-        ttk.Label(self.input_frame, text="Address Sequence (PID:VA, ...):").grid(row=6, column=0, columnspan=2, padx=5,
+        ttk.Label(self.input_frame, text="Address Sequence (PID:VA[:R|W|X], ...):").grid(row=6, column=0, columnspan=2, padx=5,
                                                                                  pady=5, sticky="w")
         ttk.Entry(self.input_frame, textvariable=self.simulator.sequence_str, width=30).grid(row=7, column=0,
                                                                                              columnspan=2, padx=5,
                                                                                              pady=5)
 
+        # Trace File (replaces the typed sequence when set)
+        ttk.Button(self.input_frame, text="Load Trace File", command=self.choose_trace_file,
+                   style="Accent.TButton").grid(row=8, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(self.input_frame, textvariable=self.simulator.trace_path, width=20).grid(row=8, column=1, padx=5,
+                                                                                          pady=5, sticky="w")
+
         # Algorithm Selection
-        ttk.Label(self.input_frame, text="Algorithm:").grid(row=8, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(self.input_frame, text="Algorithm:").grid(row=9, column=0, padx=5, pady=5, sticky="w")
         algo_menu = ttk.Combobox(self.input_frame, textvariable=self.simulator.algorithm,
-                                 values=["FIFO", "LRU", "Optimal"], state="readonly")
-        algo_menu.grid(row=8, column=1, padx=5, pady=5, sticky="w")
+                                 values=available_policies(), state="readonly")
+        algo_menu.grid(row=9, column=1, padx=5, pady=5, sticky="w")
+
+        # Page Table Organization
+        ttk.Label(self.input_frame, text="Page Table:").grid(row=10, column=0, padx=5, pady=5, sticky="w")
+        table_menu = ttk.Combobox(self.input_frame, textvariable=self.simulator.page_table_type,
+                                  values=available_page_tables(), state="readonly")
+        table_menu.grid(row=10, column=1, padx=5, pady=5, sticky="w")
+
+        # Optional file that receives the full log (the window keeps the newest lines)
+        ttk.Button(self.input_frame, text="Save Log To...", command=self.choose_log_file,
+                   style="Accent.TButton").grid(row=11, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(self.input_frame, textvariable=self.simulator.log_path, width=20).grid(row=11, column=1, padx=5,
+                                                                                        pady=5, sticky="w")
 
         # Initialize with one process input
         self.add_process_input()
@@ -123,6 +144,18 @@ class VirtualMemorySimulatorGUI:
         self.simulator.process_inputs.append((pid_entry, size_entry))
         self.update_pid_menu()
 
+    def choose_trace_file(self):
+        path = filedialog.askopenfilename(title="Open Address Trace",
+                                          filetypes=[("Address traces", "*.txt *.csv *.bin *.vmt *.gz"),
+                                                     ("All files", "*.*")])
+        if path:
+            self.simulator.trace_path.set(path)
+
+    def choose_log_file(self):
+        path = filedialog.asksaveasfilename(title="Save Simulation Log", defaultextension=".log",
+                                            filetypes=[("Log files", "*.log *.txt"), ("All files", "*.*")])
+        self.simulator.log_path.set(path or "")
+
     def update_pid_menu(self):
         pids = []
         for pid_entry, _ in self.simulator.process_inputs:
@@ -142,6 +175,42 @@ class VirtualMemorySimulatorGUI:
         self.simulator.step_button = ttk.Button(control_frame, text="→ Step", command=self.simulator.step_simulation,
                                                 state="disabled", style="Accent.TButton")
         self.simulator.step_button.pack(fill="x", padx=5, pady=2)
+        self.simulator.run_button = ttk.Button(control_frame, text="▶▶ Run", command=self.simulator.toggle_run,
+                                               state="disabled", style="Accent.TButton")
+        self.simulator.run_button.pack(fill="x", padx=5, pady=2)
+
+        run_n_frame = ttk.Frame(control_frame)
+        run_n_frame.pack(fill="x", padx=5, pady=2)
+        self.simulator.run_n_button = ttk.Button(run_n_frame, text="Run N Steps", command=self.simulator.run_n_steps,
+                                                 state="disabled", style="Accent.TButton")
+        self.simulator.run_n_button.pack(side="left", fill="x", expand=True)
+        ttk.Entry(run_n_frame, textvariable=self.simulator.run_steps, width=8).pack(side="left", padx=5)
+
+        self.simulator.run_end_button = ttk.Button(control_frame, text="⇥ Run to End", command=self.simulator.run_to_end,
+                                                   state="disabled", style="Accent.TButton")
+        self.simulator.run_end_button.pack(fill="x", padx=5, pady=2)
+
+        speed_frame = ttk.Frame(control_frame)
+        speed_frame.pack(fill="x", padx=5, pady=2)
+        ttk.Label(speed_frame, text="Run Speed (steps/s):").pack(side="left")
+        ttk.Spinbox(speed_frame, from_=1, to=1000, textvariable=self.simulator.run_speed, width=6).pack(side="left",
+                                                                                                    padx=5)
+        # Seeking restores the nearest checkpoint and replays forward
+        self.simulator.step_back_button = ttk.Button(control_frame, text="← Step Back",
+                                                     command=self.simulator.step_back, state="disabled",
+                                                     style="Accent.TButton")
+        self.simulator.step_back_button.pack(fill="x", padx=5, pady=2)
+        self.simulator.rewind_button = ttk.Button(control_frame, text="⏮ Rewind", command=self.simulator.rewind,
+                                                  state="disabled", style="Accent.TButton")
+        self.simulator.rewind_button.pack(fill="x", padx=5, pady=2)
+
+        seek_frame = ttk.Frame(control_frame)
+        seek_frame.pack(fill="x", padx=5, pady=2)
+        self.simulator.seek_button = ttk.Button(seek_frame, text="Seek to Step", command=self.simulator.seek_to_step,
+                                                state="disabled", style="Accent.TButton")
+        self.simulator.seek_button.pack(side="left", fill="x", expand=True)
+        ttk.Entry(seek_frame, textvariable=self.simulator.seek_step, width=8).pack(side="left", padx=5)
+
         ttk.Button(control_frame, text="↺ Reset", command=self.simulator.reset_simulation, style="Accent.TButton").pack(
             fill="x", padx=5, pady=2)
 
@@ -155,12 +224,9 @@ class VirtualMemorySimulatorGUI:
                                                                                                        sticky="w")
         pt_frame = ttk.Frame(display_frame)
         pt_frame.grid(row=1, column=0, padx=5, pady=5)
-        self.simulator.page_table_text = tk.Text(pt_frame, height=8, width=30, bg="#2a2a2a", fg="#e0e0e0",
-                                                 font=("Arial", 10))
-        self.simulator.page_table_text.pack(side="left")
-        pt_scroll = ttk.Scrollbar(pt_frame, orient="vertical", command=self.simulator.page_table_text.yview)
-        pt_scroll.pack(side="right", fill="y")
-        self.simulator.page_table_text.config(yscrollcommand=pt_scroll.set)
+        self.simulator.page_table_view = VirtualListView(pt_frame, height=8, width=30, bg="#2a2a2a", fg="#e0e0e0",
+                                                         font=("Arial", 10))
+        self.simulator.page_table_view.pack()
 
         # Physical Memory Display
         ttk.Label(display_frame, text="Physical Memory:", font=("Arial", 12, "bold"), background=None).grid(row=0,
@@ -170,12 +236,9 @@ class VirtualMemorySimulatorGUI:
                                                                                                             sticky="w")
         pm_frame = ttk.Frame(display_frame)
         pm_frame.grid(row=1, column=1, padx=5, pady=5)
-        self.simulator.physical_memory_text = tk.Text(pm_frame, height=8, width=30, bg="#2a2a2a", fg="#e0e0e0",
-                                                      font=("Arial", 10))
-        self.simulator.physical_memory_text.pack(side="left")
-        pm_scroll = ttk.Scrollbar(pm_frame, orient="vertical", command=self.simulator.physical_memory_text.yview)
-        pm_scroll.pack(side="right", fill="y")
-        self.simulator.physical_memory_text.config(yscrollcommand=pm_scroll.set)
+        self.simulator.physical_memory_view = VirtualListView(pm_frame, height=8, width=30, bg="#2a2a2a",
+                                                              fg="#e0e0e0", font=("Arial", 10))
+        self.simulator.physical_memory_view.pack()
 
         # TLB Display
         ttk.Label(display_frame, text="TLB:", font=("Arial", 12, "bold"), background=None).grid(row=2, column=0, padx=5,
@@ -218,11 +281,9 @@ class VirtualMemorySimulatorGUI:
                                                                                                            sticky="w")
         log_frame = ttk.Frame(display_frame)
         log_frame.grid(row=5, column=0, columnspan=2, padx=5, pady=5)
-        self.simulator.log_text = tk.Text(log_frame, height=6, width=60, bg="#2a2a2a", fg="#e0e0e0", font=("Arial", 10))
-        self.simulator.log_text.pack(side="left")
-        log_scroll = ttk.Scrollbar(log_frame, orient="vertical", command=self.simulator.log_text.yview)
-        log_scroll.pack(side="right", fill="y")
-        self.simulator.log_text.config(yscrollcommand=log_scroll.set)
+        self.simulator.log_view = VirtualListView(log_frame, height=6, width=60, follow=True, bg="#2a2a2a",
+                                                  fg="#e0e0e0", font=("Arial", 10))
+        self.simulator.log_view.pack()
 
         # Statistics
         self.simulator.stats_label = ttk.Label(display_frame,
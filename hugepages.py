@@ -0,0 +1,499 @@
+import argparse
+import heapq
+
+from algorithms import ReplacementPolicy
+from cli import add_output_argument, add_system_arguments, add_trace_arguments, build_engine, replay, write_csv
+from engine import SimulationEngine
+from events import EVICTION_EVENT, WRITEBACK_EVENT, PROMOTION_EVENT, DEMOTION_EVENT
+from memory_manager import MemoryManager
+from page_tables import REFERENCED, DIRTY
+from process import page_shift
+
+HUGE_PAGE_SIZE = 2 * 1024 * 1024
+PROMOTIONS = ("fault", "density")
+SCAN_INTERVAL = 10000
+PROMOTE_THRESHOLD = 0.5
+DEMOTE_THRESHOLD = 0.1
+HUGE_PAGE_FIELDS = ["promotion", "page_faults", "huge_pages", "promotions", "demotions", "huge_fallbacks",
+                    "promotion_failures", "compactions", "pages_copied", "huge_page_memory", "fragmentation",
+                    "free_huge_blocks",
+                    "L1_tlb_reach", "mean_tlb_reach", "tlb_hit_ratio", "page_walk_accesses",
+                    "effective_access_time_ns"]
+
+
+class BuddyAllocator:
+    # Binary buddy allocator over frame numbers. A block of 2**order frames
+    # starts at a multiple of its size, and a freed block merges with its
+    # free buddy order by order. pop(), append() and len() let it stand in
+    # for MemoryManager's free frame list.
+    def __init__(self, num_frames, max_order):
+        self.num_frames = num_frames
+        self.max_order = max_order
+        self.free = [set() for _ in range(max_order + 1)]  # block starts by order
+        self.heaps = [[] for _ in range(max_order + 1)]  # lowest start first, may hold stale entries
+        self.free_count = 0
+        start = 0
+        while start < num_frames:
+            order = max_order
+            while start % (1 << order) or start + (1 << order) > num_frames:
+                order -= 1
+            self._add(start, order)
+            start += 1 << order
+        self.free_count = num_frames
+
+    def __len__(self):
+        return self.free_count
+
+    def _add(self, start, order):
+        free, heap = self.free[order], self.heaps[order]
+        free.add(start)
+        heapq.heappush(heap, start)
+        if len(heap) > 2 * len(free) + 16:
+            heap[:] = sorted(free)
+
+    def _take(self, order):
+        free, heap = self.free[order], self.heaps[order]
+        while heap:
+            start = heapq.heappop(heap)
+            if start in free:
+                free.discard(start)
+                return start
+        return None
+
+    def alloc(self, order):
+        # Lowest block of the smallest order that fits, split down to order;
+        # None if no block is large enough
+        for current in range(order, self.max_order + 1):
+            if self.free[current]:
+                start = self._take(current)
+                while current > order:
+                    current -= 1
+                    self._add(start + (1 << current), current)
+                self.free_count -= 1 << order
+                return start
+        return None
+
+    def release(self, start, order=0):
+        self.free_count += 1 << order
+        while order < self.max_order:
+            buddy = start ^ (1 << order)
+            if buddy not in self.free[order]:
+                break
+            self.free[order].discard(buddy)
+            start = min(start, buddy)
+            order += 1
+        self._add(start, order)
+
+    def pop(self):
+        frame = self.alloc(0)
+        if frame is None:
+            raise IndexError("pop from empty free frame list")
+        return frame
+
+    def append(self, frame):
+        self.release(frame)
+
+    def free_blocks(self, order):
+        # Free blocks able to hold 2**order frames
+        return sum(len(self.free[current]) << (current - order) for current in range(order, self.max_order + 1))
+
+    def fragmentation(self, order):
+        # Share of free frames that cannot serve a 2**order request (the
+        # unusable free space index); 0 when every free frame could
+        if not self.free_count:
+            return 0
+        return 1 - self.free_blocks(order) * (1 << order) / self.free_count
+
+
+class HugePageMemoryManager(MemoryManager):
+    # Base pages of page_size plus huge pages of huge_page_size, both at
+    # once. A huge page maps an aligned region of base pages onto an aligned,
+    # contiguous block of frames from the buddy allocator, and takes a single
+    # TLB entry for the whole region. Page-table entries and referenced/dirty
+    # bits stay per base page.
+    def __init__(self, memory_size, page_size, huge_page_size=HUGE_PAGE_SIZE, tlb_size=4, tlb_config=None):
+        shift = page_shift(huge_page_size // page_size) if huge_page_size % page_size == 0 else None
+        if not shift or page_shift(page_size) is None:
+            raise ValueError("Page sizes must be powers of two, with huge pages larger than base pages.")
+        tlb_config = dict(tlb_config or {})
+        tlb_config["huge_shifts"] = tuple(sorted(set(tlb_config.get("huge_shifts", ())) | {shift}))
+        super().__init__(memory_size, page_size, tlb_size, tlb_config)
+        self.huge_page_size = huge_page_size
+        self.huge_shift = shift
+        self.huge_pages = 1 << shift  # base pages per huge page
+        self.free_frames = BuddyAllocator(self.num_frames, shift)
+        self.huge_regions = {}  # (pid, region) -> first frame of its block
+        self.compactions = 0
+
+    def update_tlb(self, pid, page_num, frame_num, instruction=False):
+        shift = self.huge_shift if (pid, page_num >> self.huge_shift) in self.huge_regions else 0
+        self.tlb.insert(self.pid_id(pid), page_num, frame_num, instruction, shift)
+
+    def page_flags(self, pid, page_num):
+        # A huge page is referenced or dirty if any of its base pages is
+        region = page_num >> self.huge_shift
+        if (pid, region) not in self.huge_regions:
+            return super().page_flags(pid, page_num)
+        page_table = self.owners[self.pid_ids[pid]].page_table
+        first = region << self.huge_shift
+        flags = 0
+        for page in range(first, first + self.huge_pages):
+            flags |= page_table.page_flags(page)
+        return flags
+
+    def clear_referenced(self, pid, page_num):
+        region = page_num >> self.huge_shift
+        if (pid, region) not in self.huge_regions:
+            return super().clear_referenced(pid, page_num)
+        page_table = self.owners[self.pid_ids[pid]].page_table
+        first = region << self.huge_shift
+        for page in range(first, first + self.huge_pages):
+            page_table.clear_flags(page, REFERENCED)
+
+    def release_frame(self, frame):
+        # Unmaps a base page being copied elsewhere: no writeback, and the
+        # page keeps its referenced/dirty bits
+        owner = self.frame_owner[frame]
+        pid = self.pid_names[owner]
+        page_num = self.frame_page[frame]
+        self.owners[owner].page_table[page_num] = -1
+        del self.frame_index[(pid, page_num)]
+        self.invalidate_tlb(pid, page_num)
+        self.frame_owner[frame] = -1
+        self.frame_page[frame] = -1
+        self.free_frames.release(frame)
+        if self.changed_frames is not None:
+            self.changed_frames.add(frame)
+
+    def compact(self):
+        # Migrates the base pages out of the aligned block with the fewest of
+        # them, into free frames elsewhere, so that the block can serve a huge
+        # page. Needs a huge page worth of free frames; returns the pages moved.
+        free = self.free_frames
+        if len(free) < self.huge_pages:
+            return None
+        counts = {}
+        for frame in range(self.num_frames - self.num_frames % self.huge_pages):
+            if self.frame_owner[frame] != -1:
+                block = frame >> self.huge_shift
+                counts[block] = counts.get(block, 0) + 1
+        huge_blocks = {block >> self.huge_shift for block in self.huge_regions.values()}
+        candidates = [(count, block) for block, count in counts.items()
+                      if block not in huge_blocks and count < self.huge_pages]
+        if not candidates:
+            return None
+        block = min(candidates)[1] << self.huge_shift
+        targets, held = [], []
+        while len(targets) < self.huge_pages - len(held) and free:
+            frame = free.pop()
+            (held if block <= frame < block + self.huge_pages else targets).append(frame)
+        moved = 0
+        for frame in range(block, block + self.huge_pages):
+            if self.frame_owner[frame] != -1:
+                process = self.owners[self.frame_owner[frame]]
+                page_num = self.frame_page[frame]
+                self.release_frame(frame)
+                self.map_page(targets.pop(), process, page_num)
+                moved += 1
+        for frame in targets + held:
+            free.release(frame)
+        self.compactions += 1
+        return moved
+
+    def alloc_huge(self):
+        # A free huge block, compacting memory if it is fragmented; returns
+        # (first frame or None, pages migrated)
+        block = self.free_frames.alloc(self.huge_shift)
+        moved = 0
+        if block is None:
+            moved = self.compact()
+            if moved is not None:
+                block = self.free_frames.alloc(self.huge_shift)
+        return block, moved or 0
+
+    def map_huge(self, block, process, region):
+        # Maps the whole region onto block. Resident base pages are copied
+        # in and the rest zero-filled; returns the number copied.
+        copied = 0
+        first = region << self.huge_shift
+        page_table = process.page_table
+        for offset in range(self.huge_pages):
+            old = page_table[first + offset]
+            if old != -1:
+                self.release_frame(old)
+                copied += 1
+            self.map_page(block + offset, process, first + offset)
+        self.huge_regions[(process.pid, region)] = block
+        return copied
+
+    def invalidate_region(self, pid, region):
+        first = region << self.huge_shift
+        asid = self.pid_id(pid)
+        found = self.tlb.invalidate(asid, first, self.huge_shift)
+        # Base entries may cover the region too, from the TLB prefetcher or
+        # from before the promotion
+        for page_num in range(first, first + self.huge_pages):
+            found = self.tlb.invalidate(asid, page_num) or found
+        if found:
+            self.tlb_shootdowns += 1
+
+    def unmap_huge(self, pid, region):
+        # Evicts a whole huge page. One dirty base page makes the whole huge
+        # page dirty, so it is written back in full. Returns (block, dirty).
+        first = region << self.huge_shift
+        dirty = bool(self.page_flags(pid, first) & DIRTY)
+        block = self.huge_regions.pop((pid, region))
+        self.invalidate_region(pid, region)
+        page_table = self.owners[self.pid_ids[pid]].page_table
+        for offset in range(self.huge_pages):
+            page_num = first + offset
+            page_table.clear_flags(page_num, REFERENCED | DIRTY)
+            page_table[page_num] = -1
+            del self.frame_index[(pid, page_num)]
+            self.frame_owner[block + offset] = -1
+            self.frame_page[block + offset] = -1
+            if self.changed_frames is not None:
+                self.changed_frames.add(block + offset)
+                self.changed_pages.add((pid, page_num))
+        if dirty:
+            self.writebacks += self.huge_pages
+        self.free_frames.release(block, self.huge_shift)
+        return block, dirty
+
+    def split_huge(self, pid, region, keep):
+        # Demotes a huge page to base pages: those in keep stay where they
+        # are, the others are unmapped and their frames freed one by one
+        block = self.huge_regions.pop((pid, region))
+        self.invalidate_region(pid, region)
+        first = region << self.huge_shift
+        for offset in range(self.huge_pages):
+            if first + offset not in keep:
+                self.unmap_frame(block + offset)
+                self.free_frames.release(block + offset)
+        return block
+
+    def tlb_reach(self):
+        # Bytes of address space each TLB level currently translates
+        return {f"{level.name}_tlb_reach": sum(self.page_size << shift for _, _, _, shift in level)
+                for level in self.tlb.levels}
+
+    def huge_stats(self):
+        return {
+            "huge_pages": len(self.huge_regions),
+            "huge_page_memory": len(self.huge_regions) * self.huge_page_size,
+            "fragmentation": self.free_frames.fragmentation(self.huge_shift),
+            "free_huge_blocks": self.free_frames.free_blocks(self.huge_shift),
+            "compactions": self.compactions,
+            **self.tlb_reach(),
+        }
+
+
+class HugePagePolicy(ReplacementPolicy):
+    # Presents each huge page to the replacement policy as one page, keyed by
+    # its first base page, and every other page as itself
+    def __init__(self, policy, memory_manager):
+        super().__init__(policy.num_frames)
+        self.policy = policy
+        self.name = policy.name
+        self.memory_manager = memory_manager
+        self.huge_regions = memory_manager.huge_regions
+        self.shift = memory_manager.huge_shift
+
+    def key(self, key):
+        region = key[1] >> self.shift
+        if (key[0], region) in self.huge_regions:
+            return key[0], region << self.shift
+        return key
+
+    def on_access(self, key, step):
+        self.policy.on_access(self.key(key), step)
+
+    def on_fault(self, key, step):
+        self.policy.on_fault(self.key(key), step)
+
+    def choose_victim(self, key, step):
+        return self.policy.choose_victim(self.key(key), step)
+
+    def remove(self, key):
+        self.policy.remove(self.key(key))
+
+    def trim(self, key, step):
+        return self.policy.trim(key, step)
+
+    def must_replace(self, key):
+        return self.policy.must_replace(key)
+
+    def stats(self):
+        return self.policy.stats()
+
+
+class HugePageEngine(SimulationEngine):
+    # Decides which regions become huge pages. With promotion "fault", a
+    # fault in a region that lies wholly inside its process maps the region
+    # as a huge page whenever the buddy allocator has a free block, like
+    # transparent huge pages at fault time. With "density", faults load base
+    # pages and a scan every scan_interval references promotes regions in
+    # which at least promote_threshold of the base pages were referenced
+    # since the last scan. Under both, the scan demotes huge pages used
+    # sparsely (below demote_threshold but not idle), keeping the referenced
+    # base pages and freeing the rest. None never promotes.
+    def __init__(self, memory_manager, processes, algorithm="LRU", latency=None, promotion="fault",
+                 promote_threshold=PROMOTE_THRESHOLD, demote_threshold=DEMOTE_THRESHOLD, scan_interval=SCAN_INTERVAL):
+        if not isinstance(memory_manager, HugePageMemoryManager):
+            raise ValueError("Huge pages need a HugePageMemoryManager.")
+        if promotion is not None and promotion not in PROMOTIONS:
+            raise ValueError(f"Unknown huge page promotion: {promotion}")
+        if scan_interval < 1 or not 0 <= demote_threshold <= promote_threshold <= 1:
+            raise ValueError("Huge page scans need a positive interval and 0 <= demote <= promote <= 1.")
+        super().__init__(memory_manager, processes, algorithm, latency)
+        if self.policy.needs_future:
+            raise ValueError(f"{algorithm} needs the whole trace and cannot be combined with huge pages.")
+        self.policy = HugePagePolicy(self.policy, memory_manager)
+        self.promotion = promotion
+        self.shift = memory_manager.huge_shift
+        self.promote_pages = max(1, round(promote_threshold * memory_manager.huge_pages))
+        self.demote_pages = demote_threshold * memory_manager.huge_pages
+        self.scan_interval = scan_interval
+        self.next_scan = scan_interval
+        self.touched = {}  # (pid, region) -> base pages referenced since the last scan
+        self.promotions = 0
+        self.demotions = 0
+        self.huge_fallbacks = 0
+        self.promotion_failures = 0
+        self.pages_copied = 0
+        self.reach_samples = 0
+        self.reach_total = 0
+
+    def access_page(self, process, page_num, access=0):
+        # A due scan runs first, since it may move pages
+        if self.current_step >= self.next_scan:
+            self.next_scan += self.scan_interval
+            self.scan()
+        region = (process.pid, page_num >> self.shift)
+        touched = self.touched.get(region)
+        if touched is None:
+            touched = self.touched[region] = set()
+        touched.add(page_num)
+        return super().access_page(process, page_num, access)
+
+    def eligible(self, process, region):
+        return (region + 1) << self.shift <= process.num_pages
+
+    def handle_page_fault(self, process, page_num, instruction=False):
+        mm = self.memory_manager
+        region = page_num >> self.shift
+        if self.promotion == "fault" and self.eligible(process, region):
+            block, moved = mm.alloc_huge()
+            if block is None and not mm.free_frames:
+                # Memory is full: one eviction may free a whole block
+                victim = self.policy.choose_victim((process.pid, page_num), self.current_step)
+                mm.free_frames.append(self.evict(victim, self.algorithm))
+                block, moved = mm.alloc_huge()
+            self.pages_copied += moved
+            if block is not None:
+                self.make_huge(process, region, block)
+                frame = block + page_num % mm.huge_pages
+                mm.update_tlb(process.pid, page_num, frame, instruction)
+                return frame
+            self.huge_fallbacks += 1
+        return super().handle_page_fault(process, page_num, instruction)
+
+    def make_huge(self, process, region, block):
+        mm = self.memory_manager
+        pid = process.pid
+        first = region << self.shift
+        page_table = process.page_table
+        for page_num in range(first, first + mm.huge_pages):
+            if page_table[page_num] != -1:
+                self.policy.remove((pid, page_num))
+        self.pages_copied += mm.map_huge(block, process, region)
+        self.policy.on_fault((pid, first), self.current_step)
+        self.promotions += 1
+        if self.events is not None:
+            self.events.emit(self.current_step, PROMOTION_EVENT, pid, first, block)
+
+    def evict(self, victim, reason):
+        mm = self.memory_manager
+        region = victim[1] >> self.shift
+        if (victim[0], region) not in mm.huge_regions:
+            return super().evict(victim, reason)
+        block, dirty = mm.unmap_huge(victim[0], region)
+        if self.events is not None:
+            self.events.emit(self.current_step, EVICTION_EVENT, victim[0], victim[1], block, reason)
+            if dirty:
+                self.events.emit(self.current_step, WRITEBACK_EVENT, victim[0], victim[1], block)
+        return mm.free_frames.pop()
+
+    def demote(self, pid, region, keep):
+        mm = self.memory_manager
+        first = region << self.shift
+        self.policy.remove((pid, first))
+        block = mm.split_huge(pid, region, keep)
+        for page_num in sorted(keep):
+            self.policy.on_fault((pid, page_num), self.current_step)
+        self.demotions += 1
+        if self.events is not None:
+            self.events.emit(self.current_step, DEMOTION_EVENT, pid, first, block, len(keep))
+
+    def scan(self):
+        mm = self.memory_manager
+        # Reach as the references since the last scan left it, before any
+        # promotion or demotion
+        self.reach_samples += 1
+        self.reach_total += mm.tlb_reach()[f"{mm.tlb.dtlb.name}_tlb_reach"]
+        touched, self.touched = self.touched, {}
+        for (pid, region), pages in touched.items():
+            if (pid, region) in mm.huge_regions:
+                if len(pages) < self.demote_pages:
+                    self.demote(pid, region, pages)
+            elif (self.promotion == "density" and len(pages) >= self.promote_pages
+                  and self.eligible(self.processes[pid], region)):
+                block, moved = mm.alloc_huge()
+                self.pages_copied += moved
+                if block is None:
+                    self.promotion_failures += 1
+                else:
+                    self.make_huge(self.processes[pid], region, block)
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update(self.memory_manager.huge_stats())
+        stats.update({
+            "promotions": self.promotions,
+            "demotions": self.demotions,
+            "huge_fallbacks": self.huge_fallbacks,
+            "promotion_failures": self.promotion_failures,
+            "pages_copied": self.pages_copied,
+            "mean_tlb_reach": self.reach_total / self.reach_samples if self.reach_samples else 0,
+        })
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare base pages with transparent huge page promotion on a trace.")
+    add_trace_arguments(parser)
+    add_system_arguments(parser, tlb=64, frames_help="number of physical base frames")
+    parser.add_argument("--huge-page-size", type=int, default=HUGE_PAGE_SIZE)
+    parser.add_argument("--promote", type=float, default=PROMOTE_THRESHOLD,
+                        help="share of a region's base pages referenced in a scan interval to promote it (density)")
+    parser.add_argument("--demote", type=float, default=DEMOTE_THRESHOLD,
+                        help="share below which a huge page is split")
+    parser.add_argument("--scan-interval", type=int, default=SCAN_INTERVAL, help="references between scans")
+    add_output_argument(parser)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for promotion in (None,) + PROMOTIONS:
+        memory_manager = HugePageMemoryManager(args.frames * args.page_size, args.page_size, args.huge_page_size,
+                                               args.tlb)
+        engine = build_engine(args, memory_manager, HugePageEngine, promotion=promotion,
+                              promote_threshold=args.promote, demote_threshold=args.demote,
+                              scan_interval=args.scan_interval)
+        row = replay(engine, args.trace)
+        row["promotion"] = promotion or "none"
+        rows.append(row)
+    write_csv(rows, HUGE_PAGE_FIELDS, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+class LatencyModel:
+    # Per-event latencies in nanoseconds. Every reference pays a TLB lookup
+    # and one memory access for the data; a TLB miss adds one walk latency
+    # per page-table access, a fault a disk read, and every dirty page
+    # written back on eviction a disk write. On multi-core runs every TLB
+    # shootdown interrupt sent to another core costs shootdown_ns. Pages
+    # prefetched along with a fault ride on its disk read and only add their
+    # transfer time, prefetch_ns each.
+    def __init__(self, tlb_ns=1, memory_ns=100, walk_ns=None, disk_read_ns=5_000_000, disk_write_ns=None,
+                 shootdown_ns=4000, prefetch_ns=50_000):
+        self.tlb_ns = tlb_ns
+        self.memory_ns = memory_ns
+        self.walk_ns = memory_ns if walk_ns is None else walk_ns
+        self.disk_read_ns = disk_read_ns
+        self.disk_write_ns = disk_read_ns if disk_write_ns is None else disk_write_ns
+        self.shootdown_ns = shootdown_ns
+        self.prefetch_ns = prefetch_ns
+
+    def cost(self, stats):
+        references = stats["references"]
+        translation = (references * self.tlb_ns + stats["page_walk_accesses"] * self.walk_ns
+                       + stats.get("tlb_shootdown_ipis", 0) * self.shootdown_ns)
+        io = (stats["page_faults"] * self.disk_read_ns + stats.get("prefetches", 0) * self.prefetch_ns
+              + stats["writebacks"] * self.disk_write_ns)
+        total = translation + references * self.memory_ns + io
+        return {
+            "total_time_ns": total,
+            "translation_time_ns": translation,
+            "io_time_ns": io,
+            "effective_access_time_ns": total / references if references else 0,
+        }
@@ -1,30 +1,131 @@
-from collections import deque
+from array import array
+from page_tables import REFERENCED, DIRTY
+from tlb import TLBHierarchy
 class MemoryManager:
-    def __init__(self, memory_size, page_size, tlb_size=4):
+    def __init__(self, memory_size, page_size, tlb_size=4, tlb_config=None):
         self.memory_size = memory_size
         self.page_size = page_size
         self.num_frames = memory_size // page_size
-        self.frames = [(None, -1)] * self.num_frames  # Store (pid, page_num) tuples
-        self.tlb = []
+        # Inverted page table: parallel frame arrays of owner pid id (-1 if
+        # free) and page number, so a frame is unmapped without a page scan
+        self.frame_owner = array('i', [-1]) * self.num_frames
+        self.frame_page = array('q', [-1]) * self.num_frames
+        self.pid_ids = {}  # pid -> small integer id stored in frame_owner
+        self.pid_names = []
+        self.owners = []  # pid id -> Process, for unmapping its page table entry
+        self.frame_index = {}  # (pid, page_num) -> frame, reverse of the frame arrays
+        self.free_frames = list(range(self.num_frames - 1, -1, -1))  # Lowest frame is popped first
+        # TLB entries are tagged with the pid id as address space id (ASID);
+        # tlb_config holds TLBHierarchy options beyond the L1 size
+        self.tlb = TLBHierarchy(tlb_size, resolve=self.resolve_page, **(tlb_config or {}))
         self.tlb_size = tlb_size
-        self.fifo_queue = deque()
-        self.lru_stack = []
         self.tlb_hits = 0
         self.tlb_misses = 0
+        self.tlb_shootdowns = 0
+        self.writebacks = 0  # dirty pages written back when unmapped
+        # Frames and (pid, page_num) rows changed since an observer last
+        # drained them; None until track_changes() is called
+        self.changed_frames = None
+        self.changed_pages = None
 
-    def check_tlb(self, pid, page_num):
-        for entry in self.tlb:
-            if entry[0] == pid and entry[1] == page_num:
-                self.tlb_hits += 1
-                return entry[2]
+    def check_tlb(self, pid, page_num, instruction=False):
+        frame = self.tlb.lookup(self.pid_id(pid), page_num, instruction)
+        if frame is not None:
+            self.tlb_hits += 1
+            return frame
         self.tlb_misses += 1
         return None
 
-    def update_tlb(self, pid, page_num, frame_num):
-        if len(self.tlb) >= self.tlb_size:
-            self.tlb.pop(0)
-        self.tlb.append((pid, page_num, frame_num))
+    def update_tlb(self, pid, page_num, frame_num, instruction=False):
+        self.tlb.insert(self.pid_id(pid), page_num, frame_num, instruction)
+
+    def invalidate_tlb(self, pid, page_num):
+        if self.tlb.invalidate(self.pid_id(pid), page_num):
+            self.tlb_shootdowns += 1
+
+    def tlb_stats(self):
+        return self.tlb.stats()
+
+    def tlb_entries(self):
+        for level, asid, page_num, frame, shift in self.tlb.entries():
+            yield level, self.pid_names[asid], page_num, frame
+
+    def resolve_page(self, asid, page_num):
+        # Translation for TLB prefetches; never faults
+        process = self.owners[asid]
+        if process is None or page_num >= process.num_pages:
+            return None
+        frame = process.page_table[page_num]
+        return frame if frame != -1 else None
+
+    def pid_id(self, pid):
+        pid_id = self.pid_ids.get(pid)
+        if pid_id is None:
+            pid_id = self.pid_ids[pid] = len(self.pid_names)
+            self.pid_names.append(pid)
+            self.owners.append(None)
+        return pid_id
+
+    def register_process(self, process):
+        self.owners[self.pid_id(process.pid)] = process
+
+    def page_flags(self, pid, page_num):
+        return self.owners[self.pid_ids[pid]].page_table.page_flags(page_num)
+
+    def clear_referenced(self, pid, page_num):
+        self.owners[self.pid_ids[pid]].page_table.clear_flags(page_num, REFERENCED)
+
+    def frame_entry(self, frame):
+        owner = self.frame_owner[frame]
+        if owner == -1:
+            return None, -1
+        return self.pid_names[owner], self.frame_page[frame]
+
+    def track_changes(self):
+        self.changed_frames = set()
+        self.changed_pages = set()
+
+    def drain_changes(self):
+        frames, pages = self.changed_frames, self.changed_pages
+        self.changed_frames = set()
+        self.changed_pages = set()
+        return frames, pages
+
+    def map_page(self, frame, process, page_num):
+        if self.frame_owner[frame] != -1:
+            self.unmap_frame(frame)
+        self.frame_owner[frame] = self.pid_id(process.pid)
+        self.frame_page[frame] = page_num
+        self.frame_index[(process.pid, page_num)] = frame
+        process.page_table[page_num] = frame
+        if self.changed_frames is not None:
+            self.changed_frames.add(frame)
+            self.changed_pages.add((process.pid, page_num))
+
+    def unmap_frame(self, frame):
+        # Clears the owner's page table entry and any TLB entry for the page,
+        # writing the page back first if it is dirty. Returns (pid, page_num,
+        # dirty), or None for a free frame.
+        owner = self.frame_owner[frame]
+        if owner == -1:
+            return None
+        pid = self.pid_names[owner]
+        page_num = self.frame_page[frame]
+        page_table = self.owners[owner].page_table
+        dirty = bool(page_table.page_flags(page_num) & DIRTY)
+        if dirty:
+            self.writebacks += 1
+        page_table.clear_flags(page_num, REFERENCED | DIRTY)
+        page_table[page_num] = -1
+        del self.frame_index[(pid, page_num)]
+        self.invalidate_tlb(pid, page_num)
+        self.frame_owner[frame] = -1
+        self.frame_page[frame] = -1
+        if self.changed_frames is not None:
+            self.changed_frames.add(frame)
+            self.changed_pages.add((pid, page_num))
+        return pid, page_num, dirty
 
     def get_memory_utilization(self):
-        used_frames = sum(1 for pid, page in self.frames if page != -1)
+        used_frames = self.num_frames - len(self.free_frames)
         return (used_frames / self.num_frames) * 100 if self.num_frames > 0 else 0
\ No newline at end of file
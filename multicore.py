@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from algorithms import available_policies
+from cli import add_output_argument, add_trace_arguments, parse_int_list, parse_names, write_csv
+from engine import SimulationEngine
+from latency import LatencyModel
+from memory_manager import MemoryManager
+from process import Process
+from tlb import TLBHierarchy
+from trace_loader import (READ, chunk_accesses, detect_format, open_trace, open_trace_chunks, validate_trace,
+                          validate_trace_chunks)
+
+MULTICORE_FIELDS = ["policy", "num_cpus", "quantum", "memory_size", "page_size", "num_frames", "tlb_size",
+                    "references", "page_faults", "fault_rate", "tlb_hits", "tlb_misses", "tlb_hit_ratio",
+                    "page_walk_accesses", "tlb_shootdowns", "tlb_shootdown_ipis", "tlb_remote_invalidations",
+                    "translation_time_ns", "effective_access_time_ns"]
+CPU_FIELDS = ["policy", "num_cpus", "quantum", "memory_size", "tlb_size", "cpu", "references", "tlb_hits",
+              "tlb_misses", "tlb_hit_rate", "page_walk_accesses", "shootdown_ipis", "translation_time_ns"]
+
+
+class CPUOutOfRange(ValueError):
+    # A trace item names a CPU the simulated system does not have
+    pass
+
+
+class MulticoreMemoryManager(MemoryManager):
+    # One frame pool shared by num_cpus cores, each with its own TLB
+    # hierarchy. select_cpu() points check_tlb() and update_tlb() at the TLB
+    # of the core issuing the next reference. Unmapping a page shoots it down
+    # on every other core that has run the address space, like an OS walking
+    # the address space's cpumask: one interrupt (IPI) per such core, whether
+    # or not its TLB still held the entry.
+    def __init__(self, memory_size, page_size, num_cpus, tlb_size=4, tlb_config=None):
+        if num_cpus < 1:
+            raise ValueError("A multi-core system needs at least one CPU.")
+        super().__init__(memory_size, page_size, tlb_size, tlb_config)
+        self.num_cpus = num_cpus
+        self.tlbs = [self.tlb] + [TLBHierarchy(tlb_size, resolve=self.resolve_page, **(tlb_config or {}))
+                                  for _ in range(num_cpus - 1)]
+        self.cpu = 0
+        self.active = [set() for _ in range(num_cpus)]  # asids each core has run
+        self.cpu_tlb_hits = [0] * num_cpus
+        self.cpu_tlb_misses = [0] * num_cpus
+        self.cpu_ipis = [0] * num_cpus  # shootdown interrupts received
+        self.tlb_shootdown_ipis = 0
+        self.tlb_remote_invalidations = 0
+
+    def select_cpu(self, cpu):
+        self.cpu = cpu
+        self.tlb = self.tlbs[cpu]
+
+    def check_tlb(self, pid, page_num, instruction=False):
+        self.active[self.cpu].add(self.pid_id(pid))
+        frame = super().check_tlb(pid, page_num, instruction)
+        if frame is None:
+            self.cpu_tlb_misses[self.cpu] += 1
+        else:
+            self.cpu_tlb_hits[self.cpu] += 1
+        return frame
+
+    def invalidate_tlb(self, pid, page_num):
+        asid = self.pid_id(pid)
+        found = self.tlb.invalidate(asid, page_num)
+        for cpu, tlb in enumerate(self.tlbs):
+            if cpu != self.cpu and asid in self.active[cpu]:
+                self.cpu_ipis[cpu] += 1
+                self.tlb_shootdown_ipis += 1
+                if tlb.invalidate(asid, page_num):
+                    self.tlb_remote_invalidations += 1
+                    found = True
+        if found:
+            self.tlb_shootdowns += 1
+
+    def tlb_stats(self):
+        # Level counters summed over the cores
+        totals = {}
+        for tlb in self.tlbs:
+            for level in tlb.levels:
+                hits, misses = totals.get(level.name, (0, 0))
+                totals[level.name] = (hits + level.hits, misses + level.misses)
+        stats = {}
+        for name, (hits, misses) in totals.items():
+            stats[f"{name}_tlb_hits"] = hits
+            stats[f"{name}_tlb_misses"] = misses
+            stats[f"{name}_tlb_hit_rate"] = hits / (hits + misses) * 100 if hits + misses else 0
+        if self.tlb.prefetch:
+            prefetches = sum(tlb.prefetches for tlb in self.tlbs)
+            prefetch_hits = sum(tlb.prefetch_hits for tlb in self.tlbs)
+            stats["tlb_prefetches"] = prefetches
+            stats["tlb_prefetch_hits"] = prefetch_hits
+            stats["tlb_wasted_prefetches"] = sum(tlb.prefetch_wasted for tlb in self.tlbs)
+            stats["tlb_prefetch_accuracy"] = prefetch_hits / prefetches * 100 if prefetches else 0
+        stats["tlb_shootdown_ipis"] = self.tlb_shootdown_ipis
+        stats["tlb_remote_invalidations"] = self.tlb_remote_invalidations
+        return stats
+
+
+class MulticoreEngine(SimulationEngine):
+    # References run on the CPU their trace item names (pid, va, access,
+    # cpu). Items without one run on their process's CPU from affinity,
+    # round-robin over the processes by default, or with quantum on CPU
+    # (step // quantum) % num_cpus, as if each process had a thread on every
+    # core. The shared frame pool couples the cores, so one run is sequential.
+    def __init__(self, memory_manager, processes, algorithm="FIFO", latency=None, affinity=None, quantum=None):
+        super().__init__(memory_manager, processes, algorithm, latency)
+        num_cpus = memory_manager.num_cpus
+        if affinity is None:
+            affinity = {pid: index % num_cpus for index, pid in enumerate(processes)}
+        for pid in processes:
+            if pid not in affinity:
+                raise ValueError(f"No CPU affinity for process {pid}.")
+            if not 0 <= affinity[pid] < num_cpus:
+                raise ValueError(f"CPU {affinity[pid]} for process {pid} is out of range.")
+        if quantum is not None and quantum < 1:
+            raise ValueError("The scheduling quantum must be a positive number of references.")
+        self.affinity = dict(affinity)
+        self.quantum = quantum
+        self.cpu_references = [0] * num_cpus
+        self.cpu_walk_accesses = [0] * num_cpus
+
+    def cpu_of(self, pid, cpu=None):
+        if cpu is not None:
+            if cpu >= self.memory_manager.num_cpus:
+                raise CPUOutOfRange(f"CPU {cpu} in sequence is out of range.")
+            return cpu
+        if self.quantum:
+            return (self.current_step // self.quantum) % self.memory_manager.num_cpus
+        return self.affinity[pid]
+
+    def access_on(self, cpu, pid, addr, access=READ):
+        self.memory_manager.select_cpu(cpu)
+        walks = self.page_walk_accesses
+        result = self.access(pid, addr, access)
+        self.cpu_references[cpu] += 1
+        self.cpu_walk_accesses[cpu] += self.page_walk_accesses - walks
+        return result
+
+    def access_item(self, item):
+        cpu = self.cpu_of(item[0], item[3] if len(item) > 3 else None)
+        return self.access_on(cpu, item[0], item[1], item[2] if len(item) > 2 else READ)
+
+    def step(self):
+        result = self.access_item(self.sequence[self.current_step])
+        self.current_step += 1
+        return result
+
+    def run_steps(self, count):
+        start = self.current_step
+        end = min(start + count, len(self.sequence))
+        while self.current_step < end:
+            self.step()
+        return end - start
+
+    def run(self, sequence=None):
+        # Streams items one at a time, since chunks carry no CPU ids
+        if sequence is None:
+            trace = islice(self.sequence, self.current_step, None)
+        elif self.policy.needs_future:
+            self.load(sequence)
+            trace = self.sequence
+        else:
+            trace = sequence
+        for item in trace:
+            self.access_item(item)
+            self.current_step += 1
+        return self.get_stats()
+
+    def run_chunks(self, chunks):
+        # Chunked (binary) traces are placed by affinity or quantum
+        for chunk in chunks:
+            vas = chunk[1] if isinstance(chunk[1], list) else chunk[1].tolist()
+            accesses = chunk_accesses(chunk) or itertools.repeat(READ)
+            for pid, va, access in zip(chunk[0], vas, accesses):
+                self.access_on(self.cpu_of(pid), pid, va, access)
+                self.current_step += 1
+        return self.get_stats()
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats["num_cpus"] = self.memory_manager.num_cpus
+        return stats
+
+    def cpu_stats(self):
+        mm = self.memory_manager
+        latency = self.latency
+        rows = []
+        for cpu in range(mm.num_cpus):
+            hits, misses = mm.cpu_tlb_hits[cpu], mm.cpu_tlb_misses[cpu]
+            rows.append({
+                "cpu": cpu,
+                "references": self.cpu_references[cpu],
+                "tlb_hits": hits,
+                "tlb_misses": misses,
+                "tlb_hit_rate": hits / (hits + misses) * 100 if hits + misses else 0,
+                "page_walk_accesses": self.cpu_walk_accesses[cpu],
+                "shootdown_ipis": mm.cpu_ipis[cpu],
+                "translation_time_ns": (self.cpu_references[cpu] * latency.tlb_ns
+                                        + self.cpu_walk_accesses[cpu] * latency.walk_ns
+                                        + mm.cpu_ipis[cpu] * latency.shootdown_ns),
+            })
+        return rows
+
+
+def build_grid(policies, cpu_counts, page_sizes, tlb_sizes, frame_counts, quantum=None):
+    return [{"policy": policy, "num_cpus": cpus, "quantum": quantum, "memory_size": frames * page_size,
+             "page_size": page_size, "tlb_size": tlb_size}
+            for policy, cpus, page_size, tlb_size, frames in itertools.product(
+                policies, cpu_counts, page_sizes, tlb_sizes, frame_counts)]
+
+
+def run_config(trace_path, process_sizes, config, affinity=None, shootdown_ns=4000):
+    processes = {pid: Process(pid, size, config["page_size"]) for pid, size in process_sizes.items()}
+    memory_manager = MulticoreMemoryManager(config["memory_size"], config["page_size"], config["num_cpus"],
+                                            config["tlb_size"])
+    engine = MulticoreEngine(memory_manager, processes, config["policy"], LatencyModel(shootdown_ns=shootdown_ns),
+                             affinity, config["quantum"])
+    # A trace naming a CPU the configuration lacks skips it rather than
+    # failing the whole sweep
+    try:
+        if detect_format(trace_path) == "binary" and not engine.policy.needs_future:
+            stats = engine.run_chunks(validate_trace_chunks(open_trace_chunks(trace_path), processes))
+        else:
+            stats = engine.run(validate_trace(open_trace(trace_path), processes))
+    except CPUOutOfRange as error:
+        return dict(config, skipped=str(error)), []
+    row = dict(config)
+    row.update(stats)
+    row["num_frames"] = memory_manager.num_frames
+    row["fault_rate"] = stats["page_faults"] / stats["references"] if stats["references"] else 0
+    return row, [dict(config, **cpu_row) for cpu_row in engine.cpu_stats()]
+
+
+def run_multicore_sweep(trace_path, process_sizes, grid, affinity=None, shootdown_ns=4000, workers=None):
+    # Independent configurations run in parallel worker processes. Text and
+    # CSV traces are parsed by each worker, because the binary format has no
+    # CPU ids to carry over.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_config, itertools.repeat(trace_path), itertools.repeat(process_sizes), grid,
+                                 itertools.repeat(affinity), itertools.repeat(shootdown_ns)))
+
+
+def parse_affinity(text):
+    affinity = {}
+    for item in text.split(","):
+        if "=" not in item:
+            raise argparse.ArgumentTypeError("Affinity must be given as PID=CPU,...")
+        pid, cpu = item.split("=", 1)
+        affinity[pid.strip()] = int(cpu)
+    return affinity
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a trace on simulated multi-core systems with per-CPU TLBs.")
+    add_trace_arguments(parser, trace_help="address trace file; text and CSV items may name a CPU (PID:VA:R|W|X:CPU)")
+    parser.add_argument("--cpus", type=parse_int_list, default=[1, 2, 4], help="comma-separated core counts")
+    parser.add_argument("--frames", type=parse_int_list, required=True, help="comma-separated frame counts")
+    parser.add_argument("--page-size", type=parse_int_list, default=[4096], help="comma-separated page sizes")
+    parser.add_argument("--tlb", type=parse_int_list, default=[64], help="comma-separated per-CPU L1 TLB sizes")
+    parser.add_argument("--policy", type=lambda text: parse_names(text, available_policies(), "algorithm"),
+                        default=["LRU"], help="comma-separated policies")
+    parser.add_argument("--affinity", type=parse_affinity,
+                        help="CPU of each process for references without a CPU id, as PID=CPU,...")
+    parser.add_argument("--quantum", type=int,
+                        help="spread references without a CPU id over all cores, switching every QUANTUM references")
+    parser.add_argument("--shootdown-ns", type=float, default=4000, help="cost of one shootdown interrupt")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    add_output_argument(parser)
+    parser.add_argument("--per-cpu", help="also write one row per core and configuration to this CSV")
+    args = parser.parse_args(argv)
+
+    if min(args.cpus) < 1:
+        parser.error("Core counts must be positive.")
+    if args.affinity and max(args.affinity.values()) >= min(args.cpus):
+        parser.error("Affinity names a CPU beyond the smallest core count.")
+    grid = build_grid(args.policy, args.cpus, args.page_size, args.tlb, args.frames, args.quantum)
+    results = run_multicore_sweep(args.trace, dict(args.process), grid, args.affinity, args.shootdown_ns,
+                                  args.workers)
+    for row, _ in results:
+        if "skipped" in row:
+            print(f"Skipped {row['policy']} on {row['num_cpus']} cores: {row['skipped']}", file=sys.stderr)
+    results = [(row, cpu_rows) for row, cpu_rows in results if "skipped" not in row]
+    if not results:
+        parser.error("The trace names CPUs beyond every core count.")
+    write_csv([row for row, _ in results], MULTICORE_FIELDS, args.output)
+    if args.per_cpu:
+        write_csv([cpu_row for _, cpu_rows in results for cpu_row in cpu_rows], CPU_FIELDS, args.per_cpu)
+
+
+if __name__ == "__main__":
+    main()
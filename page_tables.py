@@ -0,0 +1,228 @@
+from array import array
+
+# Registry of page-table organizations by display name, in registration order
+PAGE_TABLE_TYPES = {}
+RADIX_LEVEL_BITS = 9  # index bits of every level below the root, as on x86-64
+HASH_BUCKETS = 1024
+# Page-table entry status bits
+REFERENCED = 1
+DIRTY = 2
+
+
+def register_page_table(name, **defaults):
+    def register(cls):
+        PAGE_TABLE_TYPES[name] = (cls, defaults)
+        return cls
+    return register
+
+
+def available_page_tables():
+    return list(PAGE_TABLE_TYPES)
+
+
+def create_page_table(name, num_pages, **options):
+    if name not in PAGE_TABLE_TYPES:
+        raise ValueError(f"Unknown page table type: {name}")
+    cls, defaults = PAGE_TABLE_TYPES[name]
+    return cls(num_pages, **dict(defaults, **options))
+
+
+class PageTable:
+    # Maps page numbers to frames (-1 if not resident). walk() returns the
+    # frame together with the number of memory accesses the lookup costs.
+    # Referenced/dirty bits are kept per page beside the mapping; sparse
+    # tables only store them for pages that have any set.
+    sparse = False
+
+    def __init__(self, num_pages):
+        self.num_pages = num_pages
+        self.flags = {}
+
+    def mark(self, page_num, bits):
+        flags = self.flags
+        flags[page_num] = flags.get(page_num, 0) | bits
+
+    def page_flags(self, page_num):
+        return self.flags.get(page_num, 0)
+
+    def clear_flags(self, page_num, bits):
+        remaining = self.flags.pop(page_num, 0) & ~bits
+        if remaining:
+            self.flags[page_num] = remaining
+
+    def __len__(self):
+        return self.num_pages
+
+    def __getitem__(self, page_num):
+        return self.walk(page_num)[0]
+
+    def __setitem__(self, page_num, frame):
+        raise NotImplementedError
+
+    def walk(self, page_num):
+        raise NotImplementedError
+
+    def mapped(self):
+        raise NotImplementedError
+
+    def table_entries(self):
+        raise NotImplementedError
+
+
+@register_page_table("Flat")
+class FlatPageTable(PageTable):
+    def __init__(self, num_pages):
+        super().__init__(num_pages)
+        self.entries = array('i', [-1]) * num_pages  # int32 frame numbers
+        self.flags = bytearray(num_pages)
+
+    def mark(self, page_num, bits):
+        self.flags[page_num] |= bits
+
+    def page_flags(self, page_num):
+        return self.flags[page_num]
+
+    def clear_flags(self, page_num, bits):
+        self.flags[page_num] &= ~bits
+
+    def __getitem__(self, page_num):
+        return self.entries[page_num]
+
+    def __setitem__(self, page_num, frame):
+        self.entries[page_num] = frame
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def walk(self, page_num):
+        return self.entries[page_num], 1
+
+    def mapped(self):
+        for page_num, frame in enumerate(self.entries):
+            if frame != -1:
+                yield page_num, frame
+
+    def table_entries(self):
+        return self.num_pages
+
+
+class RadixPageTable(PageTable):
+    # bits lists the index width of each level, root first. Inner levels are
+    # Python lists of children, leaves are int32 arrays, and both are only
+    # allocated when a page below them is first mapped.
+    sparse = True
+
+    def __init__(self, num_pages, levels=2, bits=None):
+        super().__init__(num_pages)
+        if bits is None:
+            needed = max(1, (num_pages - 1).bit_length())
+            bits = [max(1, needed - RADIX_LEVEL_BITS * (levels - 1))] + [RADIX_LEVEL_BITS] * (levels - 1)
+        bits = list(bits)
+        if len(bits) != levels or min(bits) < 1:
+            raise ValueError(f"A {levels}-level page table needs {levels} positive bit widths.")
+        if num_pages > 1 << sum(bits):
+            raise ValueError(f"{sum(bits)} index bits cannot address {num_pages} pages.")
+        self.bits = bits
+        self.levels = levels
+        # (shift, mask) for each inner level, root first
+        self.inner = []
+        shift = sum(bits)
+        for width in bits[:-1]:
+            shift -= width
+            self.inner.append((shift, (1 << width) - 1))
+        self.leaf_mask = (1 << bits[-1]) - 1
+        self.root = [None] * (1 << bits[0])
+        self.allocated_entries = len(self.root)
+
+    def __setitem__(self, page_num, frame):
+        node = self.root
+        for level, (shift, mask) in enumerate(self.inner, 1):
+            index = (page_num >> shift) & mask
+            child = node[index]
+            if child is None:
+                if frame == -1:
+                    return  # nothing mapped below, nothing to clear
+                size = 1 << self.bits[level]
+                child = node[index] = array('i', [-1]) * size if level == self.levels - 1 else [None] * size
+                self.allocated_entries += size
+            node = child
+        node[page_num & self.leaf_mask] = frame
+
+    def walk(self, page_num):
+        node = self.root
+        depth = 1
+        for shift, mask in self.inner:
+            node = node[(page_num >> shift) & mask]
+            if node is None:
+                return -1, depth
+            depth += 1
+        return node[page_num & self.leaf_mask], depth
+
+    def mapped(self):
+        yield from self._mapped(self.root, 0, 0)
+
+    def _mapped(self, node, level, prefix):
+        if level == self.levels - 1:
+            base = prefix << self.bits[-1]
+            for index, frame in enumerate(node):
+                if frame != -1:
+                    yield base + index, frame
+            return
+        for index, child in enumerate(node):
+            if child is not None:
+                yield from self._mapped(child, level + 1, (prefix << self.bits[level]) | index)
+
+    def table_entries(self):
+        return self.allocated_entries
+
+
+register_page_table("2-Level", levels=2)(RadixPageTable)
+register_page_table("3-Level", levels=3)(RadixPageTable)
+register_page_table("4-Level", levels=4)(RadixPageTable)
+
+
+@register_page_table("Hashed")
+class HashedPageTable(PageTable):
+    # Fixed bucket array with chaining. A lookup costs one access per chain
+    # entry it has to compare.
+    sparse = True
+
+    def __init__(self, num_pages, buckets=HASH_BUCKETS):
+        super().__init__(num_pages)
+        if buckets < 1 or buckets & (buckets - 1):
+            raise ValueError("Hashed page table bucket count must be a power of two.")
+        self.mask = buckets - 1
+        self.buckets = [[] for _ in range(buckets)]
+        self.live_entries = 0
+
+    def _bucket(self, page_num):
+        return self.buckets[((page_num * 0x9E3779B97F4A7C15) >> 32) & self.mask]
+
+    def __setitem__(self, page_num, frame):
+        chain = self._bucket(page_num)
+        for i, entry in enumerate(chain):
+            if entry[0] == page_num:
+                if frame == -1:
+                    del chain[i]
+                    self.live_entries -= 1
+                else:
+                    entry[1] = frame
+                return
+        if frame != -1:
+            chain.append([page_num, frame])
+            self.live_entries += 1
+
+    def walk(self, page_num):
+        chain = self._bucket(page_num)
+        for i, entry in enumerate(chain):
+            if entry[0] == page_num:
+                return entry[1], i + 1
+        return -1, max(len(chain), 1)
+
+    def mapped(self):
+        for chain in self.buckets:
+            for page_num, frame in chain:
+                yield page_num, frame
+
+    def table_entries(self):
+        return len(self.buckets) + self.live_entries
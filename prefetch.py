@@ -0,0 +1,157 @@
+import argparse
+from collections import Counter, OrderedDict
+
+from cli import (add_output_argument, add_system_arguments, add_trace_arguments, build_engine, parse_int_list,
+                 parse_names, replay, write_csv)
+from latency import LatencyModel
+
+# Registry of demand-paging prefetchers by name, in registration order
+PREFETCHERS = {}
+MARKOV_ENTRIES = 65536
+PREFETCH_FIELDS = ["prefetcher", "degree", "page_faults", "prefetches", "prefetch_hits", "prefetch_accuracy",
+                   "prefetch_coverage", "prefetch_evictions", "wasted_prefetches", "pollution_faults", "io_time_ns",
+                   "effective_access_time_ns"]
+
+
+def register_prefetcher(cls):
+    PREFETCHERS[cls.name] = cls
+    return cls
+
+
+def available_prefetchers():
+    return list(PREFETCHERS)
+
+
+def create_prefetcher(name, **options):
+    if name not in PREFETCHERS:
+        raise ValueError(f"Unknown prefetcher: {name}")
+    return PREFETCHERS[name](**options)
+
+
+class Prefetcher:
+    # The engine calls observe() for every page the process would have
+    # faulted on (demand faults and first uses of prefetched pages), and
+    # predict() on each demand fault for the pages to load in the same
+    # batch. Predictions that are resident or outside the process are skipped.
+    name = None
+
+    def __init__(self, degree=1):
+        if degree < 1:
+            raise ValueError("Prefetch degree must be at least one page.")
+        self.degree = degree
+
+    def observe(self, pid, page_num):
+        pass
+
+    def predict(self, pid, page_num):
+        raise NotImplementedError
+
+
+@register_prefetcher
+class NextNPrefetcher(Prefetcher):
+    name = "Next-N"
+
+    def predict(self, pid, page_num):
+        return range(page_num + 1, page_num + 1 + self.degree)
+
+
+@register_prefetcher
+class ClusterPrefetcher(Prefetcher):
+    # Fault clustering: the aligned block of degree pages around the fault
+    # is read in one batch, neighbours on both sides included
+    name = "Cluster"
+
+    def __init__(self, degree=8):
+        super().__init__(degree)
+
+    def predict(self, pid, page_num):
+        start = page_num - page_num % self.degree
+        return [page for page in range(start, start + self.degree) if page != page_num]
+
+
+@register_prefetcher
+class StridePrefetcher(Prefetcher):
+    # Per process: once two successive misses are the same stride apart,
+    # the next degree pages along that stride are predicted
+    name = "Stride"
+
+    def __init__(self, degree=1):
+        super().__init__(degree)
+        self.last = {}  # pid -> (last missing page, stride)
+        self.confirmed = False  # whether the last observed miss repeated its stride
+
+    def observe(self, pid, page_num):
+        last, stride = self.last.get(pid, (None, 0))
+        new_stride = page_num - last if last is not None else 0
+        self.last[pid] = (page_num, new_stride)
+        self.confirmed = new_stride != 0 and new_stride == stride
+
+    def predict(self, pid, page_num):
+        if not self.confirmed:
+            return ()
+        stride = self.last[pid][1]
+        return [page_num + stride * k for k in range(1, self.degree + 1)]
+
+
+@register_prefetcher
+class MarkovPrefetcher(Prefetcher):
+    # History-based: counts which page followed each missing page in a
+    # process's miss stream and predicts the degree most frequent successors.
+    # At most max_entries pages keep a history, least recently missed first
+    # to go.
+    name = "Markov"
+
+    def __init__(self, degree=2, max_entries=MARKOV_ENTRIES):
+        super().__init__(degree)
+        if max_entries < 1:
+            raise ValueError("The Markov table needs at least one entry.")
+        self.max_entries = max_entries
+        self.table = OrderedDict()  # (pid, page) -> Counter of following pages
+        self.last = {}  # pid -> last missing page
+
+    def observe(self, pid, page_num):
+        last = self.last.get(pid)
+        self.last[pid] = page_num
+        if last is None or last == page_num:
+            return
+        key = (pid, last)
+        successors = self.table.get(key)
+        if successors is None:
+            successors = self.table[key] = Counter()
+            if len(self.table) > self.max_entries:
+                self.table.popitem(last=False)
+        else:
+            self.table.move_to_end(key)
+        successors[page_num] += 1
+
+    def predict(self, pid, page_num):
+        successors = self.table.get((pid, page_num))
+        if not successors:
+            return ()
+        return [page for page, _ in successors.most_common(self.degree)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare demand-paging prefetchers on a trace.")
+    add_trace_arguments(parser)
+    add_system_arguments(parser)
+    parser.add_argument("--prefetcher", default=available_prefetchers(),
+                        type=lambda text: parse_names(text, PREFETCHERS, "prefetcher"),
+                        help="comma-separated prefetchers (default: all)")
+    parser.add_argument("--degree", type=parse_int_list, default=[1, 4], help="comma-separated prefetch degrees")
+    parser.add_argument("--prefetch-ns", type=float, default=50_000, help="transfer time of one prefetched page")
+    add_output_argument(parser)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name, degree in [(None, 0)] + [(name, degree) for name in args.prefetcher for degree in args.degree]:
+        prefetcher = create_prefetcher(name, degree=degree) if name else None
+        engine = build_engine(args, latency=LatencyModel(prefetch_ns=args.prefetch_ns), prefetcher=prefetcher)
+        row = replay(engine, args.trace)
+        row.update(prefetcher=name or "none", degree=degree)
+        rows.append(row)
+    write_csv(rows, PREFETCH_FIELDS, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,48 @@
+from page_tables import create_page_table
+
+try:
+    import numpy as np
+except ImportError:  # the vectorized path is optional
+    np = None
+
+
+def page_shift(page_size):
+    # Shift amount for power-of-two page sizes, None otherwise
+    if page_size & (page_size - 1) == 0:
+        return page_size.bit_length() - 1
+    return None
+
+
+def split_addresses(vas, page_size):
+    # Page numbers and offsets for a whole chunk of virtual addresses at once
+    shift = page_shift(page_size)
+    if np is not None:
+        vas = np.asarray(vas, dtype=np.uint64)
+        if shift is not None:
+            return vas >> np.uint64(shift), vas & np.uint64(page_size - 1)
+        return np.divmod(vas, np.uint64(page_size))
+    if shift is not None:
+        mask = page_size - 1
+        return [va >> shift for va in vas], [va & mask for va in vas]
+    return [va // page_size for va in vas], [va % page_size for va in vas]
+
+
 class Process:
-    def __init__(self, pid, process_size, page_size):
+    def __init__(self, pid, process_size, page_size, page_table="Flat", **table_options):
         self.pid = pid
         self.process_size = process_size
         self.page_size = page_size
+        self.page_shift = page_shift(page_size)
         self.num_pages = (process_size + page_size - 1) // page_size
-        self.page_table = [-1] * self.num_pages
+        # Frame numbers, -1 if not resident; organization chosen from page_tables
+        self.page_table = create_page_table(page_table, self.num_pages, **table_options)
 
     def get_page_number(self, virtual_address):
+        if self.page_shift is not None:
+            return virtual_address >> self.page_shift
         return virtual_address // self.page_size
 
     def get_offset(self, virtual_address):
-        return virtual_address % self.page_size
\ No newline at end of file
+        if self.page_shift is not None:
+            return virtual_address & (self.page_size - 1)
+        return virtual_address % self.page_size
@@ -1,8 +1,19 @@
+import time
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import ttk, messagebox
 from process import Process
 from memory_manager import MemoryManager
-from algorithms import handle_page_fault_fifo, handle_page_fault_lru, replace_page_optimal
+from page_tables import DIRTY
+from engine import SimulationEngine, TLB_HIT, PAGE_TABLE_HIT
+from trace_loader import READ, iter_text_trace, open_trace, validate_trace
+from views import RingLog
+from checkpoint import Checkpointer
+
+REFRESH_INTERVAL = 1 / 30  # seconds between display refreshes while running
+BATCH_TIME = 0.02  # seconds of simulation per after() tick before yielding to Tk
+FRAME_WIDTH = 40
+FRAME_HEIGHT = 60
+CHECKPOINT_INTERVAL = 1000  # steps between snapshots used to seek backwards
 
 
 class VirtualMemorySimulator:
@@ -13,13 +24,28 @@ class VirtualMemorySimulator:
         self.processes = {}
         self.process_inputs = []
         self.sequence_str = tk.StringVar()
+        self.trace_path = tk.StringVar()
         self.algorithm = tk.StringVar(value="FIFO")
+        self.page_table_type = tk.StringVar(value="Flat")
         self.selected_pid = tk.StringVar()
         self.memory_manager = None
-        self.sequence = []
-        self.current_step = 0
-        self.page_faults = 0
-        self.hits = 0
+        self.engine = None
+        self.run_steps = tk.IntVar(value=1000)
+        self.run_speed = tk.IntVar(value=10)  # steps per second for Run
+        self.run_job = None
+        self.run_target = None
+        self.run_paced = False
+        self.batch_size = 64
+        self.last_refresh = 0
+        self.last_tick = 0
+        self.logged_step = 0
+        self.logged_faults = 0
+        self.frame_items = []
+        self.log_path = tk.StringVar()
+        self.log = RingLog()
+        self.mapped_pages = []  # page numbers listed for a sparse page table
+        self.seek_step = tk.IntVar(value=0)
+        self.checkpoints = None
 
     def start_simulation(self):
         try:
@@ -45,39 +71,32 @@ class VirtualMemorySimulator:
                     raise ValueError(f"Size for process {pid} must be positive.")
                 if pid in self.processes:
                     raise ValueError(f"Duplicate PID: {pid}")
-                self.processes[pid] = Process(pid, size, pg_size)
+                self.processes[pid] = Process(pid, size, pg_size, self.page_table_type.get())
                 valid_pids.append(pid)
 
             if not self.processes:
                 raise ValueError("At least one process must be defined.")
 
-            seq = []
-            for item in self.sequence_str.get().split(","):
-                item = item.strip()
-                if not item:
-                    continue
-                if ":" not in item:
-                    raise ValueError("Address sequence must be in PID:VA format.")
-                pid, va = item.split(":")
-                pid = pid.strip()
-                try:
-                    va = int(va.strip())
-                except ValueError:
-                    raise ValueError(f"Invalid virtual address in sequence: {va}")
-                if pid not in self.processes:
-                    raise ValueError(f"Invalid PID {pid} in sequence.")
-                if va < 0 or va >= self.processes[pid].process_size:
-                    raise ValueError(f"Address {va} out of range for process {pid}.")
-                seq.append((pid, va))
+            if self.trace_path.get():
+                trace = open_trace(self.trace_path.get())
+            else:
+                trace = iter_text_trace([self.sequence_str.get()])
+            seq = list(validate_trace(trace, self.processes))
 
             if not seq:
                 raise ValueError("Address sequence cannot be empty.")
 
+            self.stop_run()
             self.memory_manager = MemoryManager(mem_size, pg_size)
-            self.sequence = seq
-            self.current_step = 0
-            self.page_faults = 0
-            self.hits = 0
+            self.memory_manager.track_changes()
+            self.engine = SimulationEngine(self.memory_manager, self.processes, self.algorithm.get())
+            self.engine.load(seq)
+            self.checkpoints = Checkpointer(CHECKPOINT_INTERVAL)
+            self.checkpoints.save(self.engine)
+            self.logged_step = 0
+            self.logged_faults = 0
+            self.log.close()
+            self.log = RingLog(spill_path=self.log_path.get() or None)
 
             self.gui.update_pid_menu()
             if valid_pids:
@@ -86,149 +105,312 @@ class VirtualMemorySimulator:
                 self.selected_pid.set("")
 
             self.update_displays()
-            self.log_text.delete(1.0, tk.END)
-            self.step_button.config(state="normal")
+            self.log_view.set_source(0, self.log.__getitem__)
+            self.set_run_controls("normal")
+            self.set_seek_controls("normal")
             self.stats_label.config(text="Page Faults: 0 | Hits: 0 | TLB Hit Ratio: 0% | Memory Utilization: 0%")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     def step_simulation(self):
-        if self.current_step >= len(self.sequence):
+        if self.engine.finished():
             messagebox.showinfo("Simulation", "Simulation completed.")
-            self.step_button.config(state="disabled")
+            self.set_run_controls("disabled")
             return
+        self.log.append(self.run_logged_step())
+        self.refresh_displays()
+        self.update_stats()
 
-        pid, addr = self.sequence[self.current_step]
+    def run_logged_step(self):
+        item = self.engine.sequence[self.engine.current_step]
+        pid, addr = item[0], item[1]
+        access = item[2] if len(item) > 2 else READ
         process = self.processes[pid]
         page_num = process.get_page_number(addr)
         offset = process.get_offset(addr)
 
-        log = f"Process {pid}: Accessing VA {addr} (Page {page_num}, Offset {offset}): "
+        action = ("Reading", "Writing", "Fetching")[access]
+        log = f"Process {pid}: {action} VA {addr} (Page {page_num}, Offset {offset}): "
 
-        frame = self.memory_manager.check_tlb(pid, page_num)
-        if frame is not None:
-            self.hits += 1
-            phys_addr = frame * self.page_size.get() + offset
+        outcome, frame = self.engine.step()
+        self.checkpoints.record(self.engine)
+        phys_addr = frame * self.memory_manager.page_size + offset
+        if outcome == TLB_HIT:
             log += f"TLB Hit! Physical Address: {phys_addr}"
+        elif outcome == PAGE_TABLE_HIT:
+            log += f"TLB Miss, Page Table Hit! Physical Address: {phys_addr}"
         else:
-            if process.page_table[page_num] != -1:
-                self.hits += 1
-                frame = process.page_table[page_num]
-                phys_addr = frame * self.page_size.get() + offset
-                log += f"TLB Miss, Page Table Hit! Physical Address: {phys_addr}"
-                self.memory_manager.update_tlb(pid, page_num, frame)
-            else:
-                self.page_faults += 1
-                log += "Page Fault! "
-                if self.algorithm.get() == "FIFO":
-                    frame = handle_page_fault_fifo(self.memory_manager, pid, page_num)
-                elif self.algorithm.get() == "LRU":
-                    frame = handle_page_fault_lru(self.memory_manager, pid, page_num)
-                else:
-                    frame = replace_page_optimal(self.memory_manager, pid, page_num,
-                                                 self.sequence[self.current_step + 1:], self.page_size.get(),
-                                                 self.processes)
-                process.page_table[page_num] = frame
-                # Evict old page if frame was occupied
-                if self.memory_manager.frames[frame][1] != -1:
-                    old_pid, old_page = self.memory_manager.frames[frame]
-                    for p in self.processes.values():
-                        if p.pid == old_pid:
-                            for i, f in enumerate(p.page_table):
-                                if f == frame:
-                                    p.page_table[i] = -1
-                                    break
-                self.memory_manager.frames[frame] = (pid, page_num)
-                self.memory_manager.update_tlb(pid, page_num, frame)
-                phys_addr = frame * self.page_size.get() + offset
-                log += f"Loaded into Frame {frame}. Physical Address: {phys_addr}"
-
-        self.log_text.insert(tk.END, log + "\n")
-        self.log_text.see(tk.END)
+            log += f"Page Fault! Loaded into Frame {frame}. Physical Address: {phys_addr}"
+        self.logged_step = self.engine.current_step
+        self.logged_faults = self.engine.page_faults
+        return log
+
+    def toggle_run(self):
+        # Run: paced, logged stepping until the end of the trace or Pause
+        if self.run_job is not None:
+            self.stop_run()
+        else:
+            self.start_run(None, paced=True)
+
+    def run_n_steps(self):
+        try:
+            count = self.run_steps.get()
+        except tk.TclError:
+            count = 0
+        if count <= 0:
+            messagebox.showerror("Error", "Number of steps must be a positive integer.")
+            return
+        self.start_run(self.engine.current_step + count)
+
+    def run_to_end(self):
+        self.start_run(len(self.engine.sequence))
+
+    def start_run(self, target, paced=False):
+        if self.engine is None or self.engine.finished():
+            return
+        self.stop_run()
+        self.run_target = target if target is not None else len(self.engine.sequence)
+        self.run_paced = paced
+        self.last_tick = time.perf_counter()
+        self.run_button.config(text="❚❚ Pause")
+        self.run_job = self.gui.root.after(1, self.run_tick)
+
+    def stop_run(self):
+        if self.run_job is not None:
+            self.gui.root.after_cancel(self.run_job)
+            self.run_job = None
+        if self.engine is not None:
+            self.flush_batch_log()
+            self.refresh_displays()
+            self.update_stats()
+        if hasattr(self, "run_button"):
+            self.run_button.config(text="▶▶ Run")
+
+    def run_tick(self):
+        self.run_job = None
+        now = time.perf_counter()
+        remaining = self.run_target - self.engine.current_step
+        if self.run_paced:
+            # Steps owed at the chosen speed since the last tick
+            try:
+                speed = max(self.run_speed.get(), 1)
+            except tk.TclError:
+                speed = 1
+            due = int((now - self.last_tick) * speed)
+            if due:
+                self.last_tick = now
+            self.log.extend(self.run_logged_step() for _ in range(min(due, remaining)))
+        else:
+            # Grow or shrink the batch so one tick takes about BATCH_TIME
+            self.checkpoints.advance(self.engine, min(self.batch_size, remaining))
+            elapsed = time.perf_counter() - now
+            if elapsed < BATCH_TIME / 2:
+                self.batch_size *= 2
+            elif elapsed > BATCH_TIME * 2 and self.batch_size > 1:
+                self.batch_size //= 2
+
+        done = self.engine.current_step >= self.run_target
+        if done or time.perf_counter() - self.last_refresh >= REFRESH_INTERVAL:
+            self.flush_batch_log()
+            self.refresh_displays()
+            self.update_stats()
+        if done:
+            self.stop_run()
+            if self.engine.finished():
+                self.set_run_controls("disabled")
+        else:
+            self.run_job = self.gui.root.after(1 if not self.run_paced else 10, self.run_tick)
+
+    def flush_batch_log(self):
+        # One summary line for the steps run in batch mode since the last line
+        step = self.engine.current_step
+        if step > self.logged_step:
+            faults = self.engine.page_faults - self.logged_faults
+            self.log.append(f"Steps {self.logged_step + 1}-{step}: {faults} page faults, "
+                            f"{step - self.logged_step - faults} hits")
+            self.logged_step = step
+            self.logged_faults = self.engine.page_faults
+
+    def seek(self, target):
+        # Restores the nearest checkpoint at or before target and replays
+        # forward; the engine and its memory manager may be replaced
+        self.stop_run()
+        start = self.engine.current_step
+        self.engine = self.checkpoints.seek(self.engine, target)
+        self.memory_manager = self.engine.memory_manager
+        self.memory_manager.track_changes()
+        self.processes = self.engine.processes
+        self.logged_step = self.engine.current_step
+        self.logged_faults = self.engine.page_faults
+        self.log.append(f"Seek from step {start} to step {self.engine.current_step}")
         self.update_displays()
-        tlb_hit_ratio = (self.memory_manager.tlb_hits / (
-                    self.memory_manager.tlb_hits + self.memory_manager.tlb_misses) * 100) if (
-                                                                                                         self.memory_manager.tlb_hits + self.memory_manager.tlb_misses) > 0 else 0
-        mem_util = self.memory_manager.get_memory_utilization()
+        self.log_view.set_count(len(self.log))
+        self.update_stats()
+        self.set_run_controls("disabled" if self.engine.finished() else "normal")
+
+    def seek_to_step(self):
+        try:
+            target = self.seek_step.get()
+        except tk.TclError:
+            target = -1
+        if target < 0:
+            messagebox.showerror("Error", "Step must be a non-negative integer.")
+            return
+        self.seek(target)
+
+    def step_back(self):
+        if self.engine.current_step > 0:
+            self.seek(self.engine.current_step - 1)
+
+    def rewind(self):
+        self.seek(0)
+
+    def set_seek_controls(self, state):
+        for button in (self.step_back_button, self.rewind_button, self.seek_button):
+            button.config(state=state)
+
+    def set_run_controls(self, state):
+        for button in (self.step_button, self.run_button, self.run_n_button, self.run_end_button):
+            button.config(state=state)
+
+    def update_stats(self):
+        stats = self.engine.get_stats()
         self.stats_label.config(
-            text=f"Page Faults: {self.page_faults} | Hits: {self.hits} | TLB Hit Ratio: {tlb_hit_ratio:.2f}% | Memory Utilization: {mem_util:.2f}%")
-        self.current_step += 1
+            text=f"Page Faults: {stats['page_faults']} | Hits: {stats['hits']} | "
+                 f"TLB Hit Ratio: {stats['tlb_hit_ratio']:.2f}% | Writebacks: {stats['writebacks']} | "
+                 f"EAT: {stats['effective_access_time_ns']:,.0f} ns | "
+                 f"Memory Utilization: {stats['memory_utilization']:.2f}%")
 
     def update_displays(self):
-        # Update Page Table Display
-        self.page_table_text.delete(1.0, tk.END)
-        pt_text = f"Page Table (PID {self.selected_pid.get()}):\n"
-        if self.selected_pid.get() in self.processes:
-            for i, frame in enumerate(self.processes[self.selected_pid.get()].page_table):
-                pt_text += f"Page {i}: {'Frame ' + str(frame) if frame != -1 else 'Not in memory'}\n"
+        self.draw_page_table()
+        self.draw_physical_memory()
+        self.draw_tlb()
+        self.draw_frames()
+        if self.memory_manager:
+            self.memory_manager.drain_changes()
+        self.last_refresh = time.perf_counter()
+
+    def refresh_displays(self):
+        # The list views only render their visible rows, so they are simply
+        # refreshed; the canvas reconfigures just the frames that changed
+        self.last_refresh = time.perf_counter()
+        if not self.memory_manager:
+            return
+        frames, pages = self.memory_manager.drain_changes()
+        pid = self.selected_pid.get()
+        if pid in self.processes and self.processes[pid].page_table.sparse and any(
+                owner == pid for owner, _ in pages):
+            self.draw_page_table()
+        else:
+            self.page_table_view.refresh()
+        self.physical_memory_view.refresh()
+        for frame in frames:
+            self.update_frame_item(frame)
+        self.draw_tlb()
+        self.log_view.set_count(len(self.log))
+
+    def page_table_row(self, page_num, frame):
+        return f"Page {page_num}: {'Frame ' + str(frame) if frame != -1 else 'Not in memory'}"
+
+    def physical_memory_row(self, frame):
+        pid, page = self.memory_manager.frame_entry(frame)
+        if page != -1 and pid is not None:
+            dirty = " (dirty)" if self.memory_manager.page_flags(pid, page) & DIRTY else ""
+            return f"Frame {frame}: PID {pid} Page {page}{dirty}"
+        return f"Frame {frame}: Free"
+
+    def draw_page_table(self):
+        pid = self.selected_pid.get()
+        title = f"Page Table (PID {pid}):"
+        if pid not in self.processes:
+            self.page_table_view.set_source(1, lambda i: "Select a valid process to view its page table.", title)
+            return
+        page_table = self.processes[pid].page_table
+        if page_table.sparse:
+            # Sparse tables only list the pages that are mapped
+            self.mapped_pages = sorted(page_num for page_num, _ in page_table.mapped())
+            pages = self.mapped_pages
+            self.page_table_view.set_source(len(pages), lambda i: self.page_table_row(pages[i], page_table[pages[i]]),
+                                            title)
         else:
-            pt_text += "Select a valid process to view its page table.\n"
-        self.page_table_text.insert(tk.END, pt_text)
+            self.page_table_view.set_source(len(page_table), lambda i: self.page_table_row(i, page_table[i]), title)
 
-        # Update Physical Memory Display
-        self.physical_memory_text.delete(1.0, tk.END)
-        pm_text = "Physical Memory:\n"
+    def draw_physical_memory(self):
         if self.memory_manager:
-            for i, (pid, page) in enumerate(self.memory_manager.frames):
-                if page != -1 and pid is not None:
-                    pm_text += f"Frame {i}: PID {pid} Page {page}\n"
-                else:
-                    pm_text += f"Frame {i}: Free\n"
-        self.physical_memory_text.insert(tk.END, pm_text)
-
-        # Update TLB Display
+            self.physical_memory_view.set_source(self.memory_manager.num_frames, self.physical_memory_row,
+                                                 "Physical Memory:")
+        else:
+            self.physical_memory_view.clear()
+
+    def draw_tlb(self):
         self.tlb_text.delete(1.0, tk.END)
         tlb_text = "TLB:\n"
         if self.memory_manager:
-            for pid, page_num, frame_num in self.memory_manager.tlb:
-                tlb_text += f"PID {pid}, Page {page_num} -> Frame {frame_num}\n"
+            for level, pid, page_num, frame_num in self.memory_manager.tlb_entries():
+                tlb_text += f"{level}: PID {pid}, Page {page_num} -> Frame {frame_num}\n"
         self.tlb_text.insert(tk.END, tlb_text)
 
-        # Update Memory Frames Canvas
+    def draw_frames(self):
+        # Creates the canvas items once; later refreshes reconfigure them
         self.canvas.delete("all")
+        self.frame_items = []
         if self.memory_manager:
-            frame_width = 40
-            frame_height = 60
-            total_width = len(self.memory_manager.frames) * (frame_width + 10) + 10  # Total width needed
-            total_height = frame_height + 40  # Increased height for frame numbers
+            total_width = self.memory_manager.num_frames * (FRAME_WIDTH + 10) + 10  # Total width needed
+            total_height = FRAME_HEIGHT + 40  # Increased height for frame numbers
 
             # Set canvas scroll region
             self.canvas.configure(scrollregion=(0, 0, total_width, total_height))
 
-            for i, (pid, page) in enumerate(self.memory_manager.frames):
-                x = 10 + i * (frame_width + 10)
+            for i in range(self.memory_manager.num_frames):
+                x = 10 + i * (FRAME_WIDTH + 10)
                 y = 10
-                color = "#4CAF50" if page != -1 else "#4a4a4a"
-                self.canvas.create_rectangle(x, y, x + frame_width, y + frame_height, fill=color, outline="#e0e0e0")
+                rect = self.canvas.create_rectangle(x, y, x + FRAME_WIDTH, y + FRAME_HEIGHT, outline="#e0e0e0")
                 # PID:Page or Free label inside the frame
-                text = f"{pid}:{page}" if page != -1 and pid is not None else "Free"
-                self.canvas.create_text(x + frame_width / 2, y + frame_height / 2, text=text, fill="#e0e0e0",
-                                        font=("Arial", 8))
+                label = self.canvas.create_text(x + FRAME_WIDTH / 2, y + FRAME_HEIGHT / 2, fill="#e0e0e0",
+                                                font=("Arial", 8))
                 # Frame number below the frame
-                self.canvas.create_text(x + frame_width / 2, y + frame_height + 15, text=f"F{i}", fill="#e0e0e0",
+                self.canvas.create_text(x + FRAME_WIDTH / 2, y + FRAME_HEIGHT + 15, text=f"F{i}", fill="#e0e0e0",
                                         font=("Arial", 8))
+                self.frame_items.append((rect, label))
+                self.update_frame_item(i)
+
+    def update_frame_item(self, frame):
+        pid, page = self.memory_manager.frame_entry(frame)
+        rect, label = self.frame_items[frame]
+        self.canvas.itemconfigure(rect, fill="#4CAF50" if page != -1 else "#4a4a4a")
+        self.canvas.itemconfigure(label, text=f"{pid}:{page}" if page != -1 and pid is not None else "Free")
 
     def reset_simulation(self):
+        self.stop_run()
         self.memory_size.set(0)
         self.page_size.set(0)
         self.sequence_str.set("")
+        self.trace_path.set("")
         self.algorithm.set("FIFO")
+        self.page_table_type.set("Flat")
         self.selected_pid.set("")
         for pid_entry, size_entry in self.process_inputs:
             pid_entry.delete(0, tk.END)
             size_entry.delete(0, tk.END)
         self.process_inputs = []
-        self.process_frame.destroy()
-        self.process_frame = ttk.Frame(self.gui.input_frame)
-        self.process_frame.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
+        self.gui.process_frame.destroy()
+        self.gui.process_frame = ttk.Frame(self.gui.input_frame)
+        self.gui.process_frame.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
         self.gui.add_process_input()
         self.processes.clear()
         self.memory_manager = None
-        self.page_table_text.delete(1.0, tk.END)
-        self.physical_memory_text.delete(1.0, tk.END)
+        self.engine = None
+        self.page_table_view.clear()
+        self.physical_memory_view.clear()
         self.tlb_text.delete(1.0, tk.END)
-        self.log_text.delete(1.0, tk.END)
+        self.log.close()
+        self.log = RingLog()
+        self.log_path.set("")
+        self.log_view.clear()
         self.canvas.delete("all")
+        self.frame_items = []
         self.stats_label.config(text="Page Faults: 0 | Hits: 0 | TLB Hit Ratio: 0% | Memory Utilization: 0%")
-        self.step_button.config(state="disabled")
+        self.set_run_controls("disabled")
+        self.set_seek_controls("disabled")
+        self.checkpoints = None
         self.gui.update_pid_menu()
\ No newline at end of file
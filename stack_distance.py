@@ -0,0 +1,160 @@
+import argparse
+import csv
+from array import array
+
+from algorithms import compute_next_use
+from cli import add_output_argument, open_output
+from process import split_addresses
+from trace_loader import open_trace, open_trace_chunks
+
+
+class FenwickTree:
+    def __init__(self, size):
+        self.size = size
+        self.tree = array('i', [0]) * (size + 1)
+
+    def add(self, index, delta):
+        tree = self.tree
+        while index <= self.size:
+            tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        tree = self.tree
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+
+class StackDistanceHistogram:
+    # counts[d] is the number of references found at stack depth d (1-based);
+    # a stack algorithm with c frames hits exactly the references with d <= c
+    def __init__(self):
+        self.counts = [0]
+        self.cold_misses = 0
+        self.references = 0
+
+    def record(self, distance):
+        counts = self.counts
+        while len(counts) <= distance:
+            counts.append(0)
+        counts[distance] += 1
+
+    def curve(self, max_size):
+        rows = []
+        hits = 0
+        for size in range(1, max_size + 1):
+            if size < len(self.counts):
+                hits += self.counts[size]
+            misses = self.references - hits
+            rows.append((size, misses, misses / self.references if self.references else 0))
+        return rows
+
+
+def page_keys(chunks, page_size):
+    for chunk in chunks:
+        pages = split_addresses(chunk[1], page_size)[0]
+        if not isinstance(pages, list):
+            pages = pages.tolist()
+        yield from zip(chunk[0], pages)
+
+
+def lru_histogram(keys):
+    # Every key keeps a marker at the time of its last reference in a Fenwick
+    # tree over time, so the LRU stack depth of a reference is the number of
+    # markers newer than the key's previous one. Times are renumbered once the
+    # tree fills up, which keeps memory proportional to the distinct keys.
+    histogram = StackDistanceHistogram()
+    last = {}
+    capacity = 1 << 16
+    tree = FenwickTree(capacity)
+    now = 0
+    for key in keys:
+        histogram.references += 1
+        if now == capacity:
+            order = sorted(last, key=last.get)
+            capacity = max(2 * len(order), 1 << 16)
+            tree = FenwickTree(capacity)
+            for now, live_key in enumerate(order, 1):
+                last[live_key] = now
+                tree.add(now, 1)
+            now = len(order)
+        now += 1
+        previous = last.get(key)
+        if previous is None:
+            histogram.cold_misses += 1
+        else:
+            histogram.record(len(last) - tree.prefix_sum(previous) + 1)
+            tree.add(previous, -1)
+        tree.add(now, 1)
+        last[key] = now
+    return histogram
+
+
+def opt_histogram(sequence, page_size):
+    # Mattson's priority stack for Belady's policy: the referenced key moves
+    # to the top and, walking down to its old depth, each level keeps the
+    # entry that is needed sooner. This is O(N x depth), not O(N log N).
+    histogram = StackDistanceHistogram()
+    next_use = compute_next_use(sequence, page_size)
+    priority = {}
+    stack = []
+    for t, item in enumerate(sequence):
+        key = (item[0], item[1] // page_size)
+        histogram.references += 1
+        previous = priority.get(key)
+        priority[key] = next_use[t]
+        if previous is None:
+            histogram.cold_misses += 1
+            depth = len(stack)
+            stack.append(None)
+        else:
+            depth = stack.index(key)
+            histogram.record(depth + 1)
+        if depth:
+            carry = stack[0]
+            for i in range(1, depth):
+                item = stack[i]
+                if priority[item] > priority[carry]:
+                    stack[i] = carry
+                    carry = item
+            stack[depth] = carry
+        stack[0] = key
+    return histogram
+
+
+def analyze(path, page_size, policy="LRU"):
+    # Returns (memory histogram, TLB histogram). The TLB is LRU, and its curve
+    # assumes memory is large enough that evictions never shoot entries down.
+    tlb = lru_histogram(page_keys(open_trace_chunks(path), page_size))
+    if policy == "LRU":
+        return tlb, tlb
+    if policy == "Optimal":
+        return opt_histogram(list(open_trace(path)), page_size), tlb
+    raise ValueError(f"Stack distance analysis supports LRU and Optimal, not {policy}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Miss-ratio curves for every memory and TLB size in one pass.")
+    parser.add_argument("trace", help="address trace file (text, CSV or binary, optionally .gz)")
+    parser.add_argument("--page-size", type=int, default=4096)
+    parser.add_argument("--policy", choices=["LRU", "Optimal"], default="LRU")
+    parser.add_argument("--max-frames", type=int, default=None, help="largest frame count (default: distinct pages)")
+    parser.add_argument("--max-tlb", type=int, default=64, help="largest TLB size")
+    add_output_argument(parser)
+    args = parser.parse_args(argv)
+
+    memory, tlb = analyze(args.trace, args.page_size, args.policy)
+    max_frames = args.max_frames or max(memory.cold_misses, 1)
+    with open_output(args.output) as out:
+        writer = csv.writer(out)
+        writer.writerow(["curve", "size", "misses", "miss_ratio"])
+        for size, misses, ratio in memory.curve(max_frames):
+            writer.writerow(["memory", size, misses, ratio])
+        for size, misses, ratio in tlb.curve(args.max_tlb):
+            writer.writerow(["tlb", size, misses, ratio])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from algorithms import available_policies
+from cli import add_output_argument, add_trace_arguments, parse_int_list, parse_names, write_csv
+from engine import SimulationEngine
+from memory_manager import MemoryManager
+from page_tables import available_page_tables
+from process import Process
+from trace_loader import (detect_format, open_trace, open_trace_chunks, validate_trace, validate_trace_chunks,
+                          write_binary_trace)
+
+RESULT_FIELDS = ["policy", "memory_size", "page_size", "num_frames", "tlb_size", "tlb_ways", "l2_tlb_size",
+                 "page_table", "references", "page_faults", "fault_rate", "hits", "tlb_hits", "tlb_misses",
+                 "tlb_hit_ratio", "L1_tlb_hit_rate", "L2_tlb_hit_rate", "page_walk_accesses", "page_table_entries",
+                 "writes", "writebacks", "effective_access_time_ns"]
+
+
+def build_grid(policies, page_sizes, tlb_sizes, memory_sizes=None, frame_counts=None, page_tables=("Flat",),
+               tlb_ways=(0,), l2_tlb_sizes=(0,)):
+    if not memory_sizes and not frame_counts:
+        raise ValueError("Either memory sizes or frame counts are required.")
+    grid = []
+    for policy, page_size, tlb_size, ways, l2_size, page_table in itertools.product(
+            policies, page_sizes, tlb_sizes, tlb_ways, l2_tlb_sizes, page_tables):
+        sizes = memory_sizes or [frames * page_size for frames in frame_counts]
+        for memory_size in sizes:
+            grid.append({"policy": policy, "memory_size": memory_size, "page_size": page_size,
+                         "tlb_size": tlb_size, "tlb_ways": ways, "l2_tlb_size": l2_size, "page_table": page_table})
+    return grid
+
+
+def prepare_trace(path, process_sizes, work_dir):
+    # Parse and validate the trace once. Workers then share one plain binary
+    # copy, which each of them memory-maps.
+    processes = {pid: Process(pid, size, size) for pid, size in process_sizes.items()}
+    if detect_format(path) == "binary" and not path.endswith(".gz"):
+        for _ in validate_trace_chunks(open_trace_chunks(path), processes):
+            pass
+        return path
+    out = os.path.join(work_dir, "trace.bin")
+    write_binary_trace(out, validate_trace(open_trace(path), processes), process_sizes)
+    return out
+
+
+def run_config(trace_path, process_sizes, config):
+    processes = {pid: Process(pid, size, config["page_size"], config["page_table"])
+                 for pid, size in process_sizes.items()}
+    tlb_config = {"l1_ways": config.get("tlb_ways", 0), "l2_entries": config.get("l2_tlb_size", 0)}
+    memory_manager = MemoryManager(config["memory_size"], config["page_size"], config["tlb_size"], tlb_config)
+    engine = SimulationEngine(memory_manager, processes, config["policy"])
+    if engine.policy.needs_future:
+        stats = engine.run(open_trace(trace_path))
+    else:
+        stats = engine.run_chunks(open_trace_chunks(trace_path))
+    row = dict(config)
+    row.update(stats)
+    row["num_frames"] = memory_manager.num_frames
+    row["fault_rate"] = stats["page_faults"] / stats["references"] if stats["references"] else 0
+    return row
+
+
+def run_sweep(trace_path, process_sizes, grid, workers=None):
+    with tempfile.TemporaryDirectory() as work_dir:
+        shared_trace = prepare_trace(trace_path, process_sizes, work_dir)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run_config, itertools.repeat(shared_trace), itertools.repeat(process_sizes),
+                                     grid))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one trace across a grid of memory configurations.")
+    add_trace_arguments(parser)
+    sizes = parser.add_mutually_exclusive_group(required=True)
+    sizes.add_argument("--memory", type=parse_int_list, help="comma-separated memory sizes in bytes")
+    sizes.add_argument("--frames", type=parse_int_list, help="comma-separated frame counts")
+    parser.add_argument("--page-size", type=parse_int_list, default=[4096], help="comma-separated page sizes")
+    parser.add_argument("--tlb", type=parse_int_list, default=[4], help="comma-separated L1 TLB sizes")
+    parser.add_argument("--tlb-ways", type=parse_int_list, default=[0],
+                        help="comma-separated L1 TLB associativities (0: fully associative)")
+    parser.add_argument("--l2-tlb", type=parse_int_list, default=[0], help="comma-separated L2 TLB sizes (0: none)")
+    parser.add_argument("--page-table", default="Flat",
+                        type=lambda text: parse_names(text, available_page_tables(), "page table type"),
+                        help=f"comma-separated page table types from {', '.join(available_page_tables())}")
+    parser.add_argument("--policy", default=",".join(available_policies()),
+                        type=lambda text: parse_names(text, available_policies(), "algorithm"),
+                        help="comma-separated policies (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    add_output_argument(parser)
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args.policy, args.page_size, args.tlb, args.memory, args.frames, args.page_table, args.tlb_ways,
+                      args.l2_tlb)
+    rows = run_sweep(args.trace, dict(args.process), grid, args.workers)
+    write_csv(rows, RESULT_FIELDS, args.output)
+
+
+if __name__ == "__main__":
+    main()
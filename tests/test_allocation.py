@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from algorithms import available_policies, create_policy
+from allocation import LocalReplacementPolicy
+from engine import SimulationEngine
+from memory_manager import MemoryManager
+from process import Process
+
+PAGE_SIZE = 4096
+PROCESS_PAGES = 48
+FRAMES = 16
+
+
+def make_trace(seed, length=3000):
+    # Two processes with a drifting hot set each
+    rng = random.Random(seed)
+    trace = []
+    for step in range(length):
+        pid = rng.choice(("P1", "P2"))
+        base = step // 300 * 5
+        page = (base + rng.randrange(12)) % PROCESS_PAGES if rng.random() < 0.8 else rng.randrange(PROCESS_PAGES)
+        trace.append((pid, page * PAGE_SIZE))
+    return trace
+
+
+def run(trace, pids, frames, policy, allocation=None):
+    processes = {pid: Process(pid, PROCESS_PAGES * PAGE_SIZE, PAGE_SIZE) for pid in pids}
+    engine = SimulationEngine(MemoryManager(frames * PAGE_SIZE, PAGE_SIZE), processes, policy, allocation=allocation)
+    engine.run(trace)
+    return engine
+
+
+@pytest.mark.parametrize("policy", available_policies())
+@pytest.mark.parametrize("seed", range(5))
+def test_equal_allocation_matches_isolated_runs(policy, seed):
+    trace = make_trace(seed)
+    local = run(trace, ("P1", "P2"), FRAMES, policy, allocation={"allocation": "equal"})
+    for pid in ("P1", "P2"):
+        isolated = run([item for item in trace if item[0] == pid], (pid,), FRAMES // 2, policy)
+        assert local.policy.faults[pid] == isolated.page_faults
+
+
+def test_arc_adapts_after_giving_a_page_to_another_process():
+    processes = {pid: Process(pid, PROCESS_PAGES * PAGE_SIZE, PAGE_SIZE) for pid in ("P1", "P2")}
+    local = LocalReplacementPolicy(4, "ARC", processes)
+    for step, key in enumerate([("P2", 0), ("P2", 1), ("P1", 0), ("P1", 1)]):
+        local.trim(key, step)
+        local.on_fault(key, step)
+    local.on_access(("P2", 1), 4)
+    # As if a controller had grown P1's allocation: its next fault takes P2's
+    # page 0, which becomes a ghost there, and P2 then faults on that ghost
+    local.quota["P1"] = 3
+    local.trim(("P1", 2), 5)
+    assert local.choose_victim(("P1", 2), 5) == ("P2", 0)
+    local.on_fault(("P1", 2), 5)
+    local.trim(("P2", 0), 6)
+    assert local.choose_victim(("P2", 0), 6)[0] == "P1"
+    local.on_fault(("P2", 0), 6)
+
+    # One ARC run in which the page went to a fault that came and went
+    arc = create_policy("ARC", 2)
+    arc.on_fault(("P2", 0), 0)
+    arc.on_fault(("P2", 1), 1)
+    arc.on_access(("P2", 1), 4)
+    assert arc.choose_victim(("P1", 2), 5) == ("P2", 0)
+    arc.on_fault(("P1", 2), 5)
+    arc.remove(("P1", 2))
+    arc.on_fault(("P2", 0), 6)
+
+    policy = local.policies["P2"]
+    assert arc.p == 1
+    assert policy.p == arc.p
+    assert [len(policy.t1), len(policy.t2), len(policy.b1), len(policy.b2)] == [
+        len(arc.t1), len(arc.t2), len(arc.b1), len(arc.b2)]
@@ -0,0 +1,51 @@
+import random
+
+from hugepages import HugePageEngine, HugePageMemoryManager
+from process import Process
+from trace_loader import READ, WRITE
+
+PAGE_SIZE = 4096
+
+
+def test_huge_page_refilled_from_l2_is_invalidated_on_eviction():
+    # Huge pages of 4 base pages in 11 frames; P2 is too small for one, so
+    # its base pages push P1's huge page out of the 3-entry L1
+    memory_manager = HugePageMemoryManager(11 * PAGE_SIZE, PAGE_SIZE, 4 * PAGE_SIZE, 3, {"l2_entries": 16})
+    processes = {"P1": Process("P1", 64 * PAGE_SIZE, PAGE_SIZE), "P2": Process("P2", 3 * PAGE_SIZE, PAGE_SIZE)}
+    engine = HugePageEngine(memory_manager, processes, "CLOCK", promotion="fault")
+    trace = [("P1", 0), ("P2", 0), ("P2", 1), ("P2", 2),
+             ("P1", 1),  # refilled into L1 from L2
+             ("P1", 4), ("P1", 8),  # region 2 evicts region 0
+             ("P1", 1)]
+    for pid, page_num in trace:
+        frame = engine.access_page(processes[pid], page_num)[1]
+        engine.current_step += 1
+        assert frame == processes[pid].page_table[page_num]
+    assert ("P1", 0) not in memory_manager.huge_regions
+
+
+def test_enhanced_second_chance_sees_dirty_base_pages_of_a_huge_page():
+    memory_manager = HugePageMemoryManager(8 * PAGE_SIZE, PAGE_SIZE, 4 * PAGE_SIZE, 4)
+    processes = {"P1": Process("P1", 64 * PAGE_SIZE, PAGE_SIZE)}
+    engine = HugePageEngine(memory_manager, processes, "Enhanced-Second-Chance", promotion="fault")
+    # Region 0 is dirty through its third base page only; region 1 is clean
+    for page_num, access in ((0, READ), (4, READ), (2, WRITE), (8, READ)):
+        engine.access_page(processes["P1"], page_num, access)
+        engine.current_step += 1
+    assert ("P1", 0) in memory_manager.huge_regions
+    assert ("P1", 1) not in memory_manager.huge_regions
+    assert memory_manager.writebacks == 0
+
+
+def test_returned_frame_holds_the_page_across_compacting_scans():
+    memory_manager = HugePageMemoryManager(40 * PAGE_SIZE, PAGE_SIZE, 8 * PAGE_SIZE, 4)
+    processes = {"P1": Process("P1", 128 * PAGE_SIZE, PAGE_SIZE)}
+    engine = HugePageEngine(memory_manager, processes, "LRU", promotion="density", promote_threshold=0.25,
+                            scan_interval=16)
+    rng = random.Random(8)
+    for _ in range(300):
+        page_num = rng.randrange(128) if rng.random() < 0.3 else rng.randrange(24)
+        frame = engine.access_page(processes["P1"], page_num)[1]
+        engine.current_step += 1
+        assert frame == processes["P1"].page_table[page_num]
+    assert memory_manager.compactions
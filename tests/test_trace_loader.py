@@ -0,0 +1,20 @@
+import pytest
+
+from trace_loader import EXECUTE, READ, WRITE, parse_access, parse_trace_item
+
+
+def test_single_letter_access_types():
+    assert parse_access("R") == READ
+    assert parse_access(" w ") == WRITE
+    assert parse_access("x") == EXECUTE
+
+
+@pytest.mark.parametrize("text", ["RW", "WX", "RWX", "", "Q"])
+def test_other_access_types_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_access(text)
+
+
+def test_multi_letter_access_in_trace_item_is_rejected():
+    with pytest.raises(ValueError):
+        parse_trace_item("P1:4096:RW")
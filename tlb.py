@@ -0,0 +1,220 @@
+from collections import OrderedDict
+
+TLB_REPLACEMENT = ("LRU", "FIFO")
+TLB_PREFETCHERS = ("Sequential", "Stride")
+
+
+class TLBLevel:
+    # One N-way set-associative TLB array. Entries are tagged with the
+    # address space id and a page-size shift relative to the base page, so a
+    # huge-page entry (shift > 0) translates every base page it covers.
+    def __init__(self, name, entries, ways=0, replacement="LRU", shifts=(0,)):
+        ways = ways or entries  # 0 means fully associative
+        if entries < 1 or entries % ways:
+            raise ValueError(f"{name} TLB size {entries} is not a multiple of {ways} ways.")
+        if replacement not in TLB_REPLACEMENT:
+            raise ValueError(f"Unknown TLB replacement: {replacement}")
+        self.name = name
+        self.entries = entries
+        self.ways = ways
+        self.num_sets = entries // ways
+        self.sets = [OrderedDict() for _ in range(self.num_sets)]
+        self.lru = replacement == "LRU"
+        self.shifts = tuple(shifts)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, asid, vpn):
+        for shift in self.shifts:
+            tag = vpn >> shift
+            ways = self.sets[tag % self.num_sets]
+            key = (asid, tag, shift)
+            frame = ways.get(key)
+            if frame is not None:
+                if self.lru:
+                    ways.move_to_end(key)
+                self.hits += 1
+                return frame + (vpn & ((1 << shift) - 1))
+        self.misses += 1
+        return None
+
+    def lookup_entry(self, asid, vpn):
+        # Like lookup(), but returns (frame, shift) so a hit can be copied
+        # to another level with its page size
+        for shift in self.shifts:
+            tag = vpn >> shift
+            ways = self.sets[tag % self.num_sets]
+            key = (asid, tag, shift)
+            frame = ways.get(key)
+            if frame is not None:
+                if self.lru:
+                    ways.move_to_end(key)
+                self.hits += 1
+                return frame + (vpn & ((1 << shift) - 1)), shift
+        self.misses += 1
+        return None
+
+    def contains(self, asid, vpn):
+        for shift in self.shifts:
+            tag = vpn >> shift
+            if (asid, tag, shift) in self.sets[tag % self.num_sets]:
+                return True
+        return False
+
+    def insert(self, asid, vpn, frame, shift=0):
+        # frame is the first frame of the (huge) page; returns the evicted key
+        tag = vpn >> shift
+        ways = self.sets[tag % self.num_sets]
+        key = (asid, tag, shift)
+        evicted = None
+        if key in ways:
+            ways.move_to_end(key)
+        elif len(ways) >= self.ways:
+            evicted = ways.popitem(last=False)[0]
+        ways[key] = frame - (vpn & ((1 << shift) - 1))
+        return evicted
+
+    def invalidate(self, asid, vpn, shift=0):
+        tag = vpn >> shift
+        return self.sets[tag % self.num_sets].pop((asid, tag, shift), None) is not None
+
+    def flush_asid(self, asid):
+        for ways in self.sets:
+            for key in [key for key in ways if key[0] == asid]:
+                del ways[key]
+
+    def __iter__(self):
+        # (asid, first base page, first frame, shift) for every valid entry
+        for ways in self.sets:
+            for (asid, tag, shift), frame in ways.items():
+                yield asid, tag << shift, frame, shift
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups * 100 if lookups else 0
+
+
+class TLBHierarchy:
+    # L1 (unified, or split into instruction and data arrays) backed by an
+    # optional inclusive L2 STLB. On an L1 miss the optional prefetcher
+    # predicts upcoming pages and, if resolve(asid, vpn) finds them resident,
+    # installs them into the last level.
+    def __init__(self, l1_entries=4, l1_ways=0, split=False, l2_entries=0, l2_ways=0, replacement="LRU",
+                 prefetch=None, prefetch_degree=1, huge_shifts=(), resolve=None):
+        shifts = (0,) + tuple(huge_shifts)
+        if split:
+            self.itlb = TLBLevel("L1i", l1_entries, l1_ways, replacement, shifts)
+            self.dtlb = TLBLevel("L1d", l1_entries, l1_ways, replacement, shifts)
+            self.levels = [self.itlb, self.dtlb]
+        else:
+            self.itlb = self.dtlb = TLBLevel("L1", l1_entries, l1_ways, replacement, shifts)
+            self.levels = [self.dtlb]
+        self.l2 = TLBLevel("L2", l2_entries, l2_ways, replacement, shifts) if l2_entries else None
+        if self.l2:
+            self.levels.append(self.l2)
+        if prefetch is not None and prefetch not in TLB_PREFETCHERS:
+            raise ValueError(f"Unknown TLB prefetcher: {prefetch}")
+        self.prefetch = prefetch
+        self.prefetch_degree = prefetch_degree
+        self.resolve = resolve
+        self.last_vpn = {}  # asid -> (last missing vpn, stride) for the stride prefetcher
+        self.prefetched = set()  # keys installed by the prefetcher and not used yet
+        self.prefetches = 0
+        self.prefetch_hits = 0
+        self.prefetch_wasted = 0  # prefetched entries evicted before any use
+
+    def lookup(self, asid, vpn, instruction=False):
+        l1 = self.itlb if instruction else self.dtlb
+        frame = l1.lookup(asid, vpn)
+        if frame is not None:
+            if self.prefetched:
+                self._used(asid, vpn)
+            return frame
+        if self.prefetch:
+            self._prefetch(asid, vpn)
+        if self.l2 is not None:
+            entry = self.l2.lookup_entry(asid, vpn)
+            if entry is not None:
+                frame, shift = entry
+                if self.prefetched:
+                    self._used(asid, vpn)
+                evicted = l1.insert(asid, vpn, frame, shift)
+                if evicted is not None and self.prefetch:
+                    self._evicted(evicted)
+                return frame
+        return None
+
+    def insert(self, asid, vpn, frame, instruction=False, shift=0):
+        evicted = (self.itlb if instruction else self.dtlb).insert(asid, vpn, frame, shift)
+        if evicted is not None and self.prefetch:
+            self._evicted(evicted)
+        if self.l2 is not None:
+            evicted = self.l2.insert(asid, vpn, frame, shift)
+            if evicted is not None and self.prefetch:
+                self._evicted(evicted)
+
+    def invalidate(self, asid, vpn, shift=0):
+        found = False
+        for level in self.levels:
+            found = level.invalidate(asid, vpn, shift) or found
+        self.prefetched.discard((asid, vpn >> shift, shift))
+        return found
+
+    def flush_asid(self, asid):
+        for level in self.levels:
+            level.flush_asid(asid)
+
+    def _used(self, asid, vpn):
+        for shift in self.dtlb.shifts:
+            key = (asid, vpn >> shift, shift)
+            if key in self.prefetched:
+                self.prefetched.discard(key)
+                self.prefetch_hits += 1
+                return
+
+    def _evicted(self, key):
+        # A prefetched entry that leaves the TLB unused was wasted
+        if key in self.prefetched:
+            self.prefetched.discard(key)
+            self.prefetch_wasted += 1
+
+    def _prefetch(self, asid, vpn):
+        if self.prefetch == "Sequential":
+            stride = 1
+        else:
+            last, last_stride = self.last_vpn.get(asid, (None, 0))
+            stride = vpn - last if last is not None else 0
+            self.last_vpn[asid] = (vpn, stride)
+            if stride == 0 or stride != last_stride:
+                return  # wait until the same stride has been seen twice
+        target = self.l2 or self.dtlb
+        for k in range(1, self.prefetch_degree + 1):
+            candidate = vpn + stride * k
+            if candidate < 0 or (asid, candidate, 0) in self.prefetched:
+                continue
+            frame = self.resolve(asid, candidate) if self.resolve else None
+            if frame is None or target.contains(asid, candidate):
+                continue
+            evicted = target.insert(asid, candidate, frame)
+            if evicted is not None:
+                self._evicted(evicted)
+            self.prefetched.add((asid, candidate, 0))
+            self.prefetches += 1
+
+    def entries(self):
+        for level in self.levels:
+            for asid, vpn, frame, shift in level:
+                yield level.name, asid, vpn, frame, shift
+
+    def stats(self):
+        stats = {}
+        for level in self.levels:
+            stats[f"{level.name}_tlb_hits"] = level.hits
+            stats[f"{level.name}_tlb_misses"] = level.misses
+            stats[f"{level.name}_tlb_hit_rate"] = level.hit_rate()
+        if self.prefetch:
+            stats["tlb_prefetches"] = self.prefetches
+            stats["tlb_prefetch_hits"] = self.prefetch_hits
+            stats["tlb_wasted_prefetches"] = self.prefetch_wasted
+            stats["tlb_prefetch_accuracy"] = self.prefetch_hits / self.prefetches * 100 if self.prefetches else 0
+        return stats
@@ -0,0 +1,315 @@
+import csv
+import gzip
+import io
+import mmap
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # chunks fall back to plain lists
+    np = None
+
+# Access types. Trace items are (pid, va) or (pid, va, access) and chunks
+# are (pids, vas) or (pids, vas, accesses); a missing access type is a read.
+# Text and CSV items may also carry a CPU id, (pid, va, access, cpu), which
+# only the multi-core engine reads.
+READ = 0
+WRITE = 1
+EXECUTE = 2
+ACCESS_NAMES = "RWX"
+
+# Binary trace layout: magic, version byte, uint16 pid count, the pids as
+# (uint8 length, utf-8 bytes), then fixed-width little-endian records of
+# (uint16 pid index, uint8 access type, uint64 virtual address). Version 1
+# records have no access type.
+TRACE_MAGIC = b"VMTR"
+TRACE_VERSION = 2
+RECORDS = {1: struct.Struct("<HQ"), 2: struct.Struct("<HBQ")}
+RECORD = RECORDS[TRACE_VERSION]
+CHUNK_RECORDS = 65536
+
+
+def parse_access(text):
+    token = text.strip().upper()
+    if len(token) != 1 or token not in ACCESS_NAMES:
+        raise ValueError(f"Invalid access type in sequence: {text} (expected R, W or X)")
+    return ACCESS_NAMES.index(token)
+
+
+def parse_cpu(text):
+    try:
+        cpu = int(text.strip())
+    except ValueError:
+        cpu = -1
+    if cpu < 0:
+        raise ValueError(f"Invalid CPU id in sequence: {text}")
+    return cpu
+
+
+def parse_trace_item(item):
+    parts = item.split(":")
+    if len(parts) not in (2, 3, 4):
+        raise ValueError("Address sequence must be in PID:VA, PID:VA:R|W|X or PID:VA:R|W|X:CPU format.")
+    try:
+        va = int(parts[1].strip())
+    except ValueError:
+        raise ValueError(f"Invalid virtual address in sequence: {parts[1]}")
+    if len(parts) == 4:
+        access = parse_access(parts[2]) if parts[2].strip() else READ
+        return parts[0].strip(), va, access, parse_cpu(parts[3])
+    if len(parts) == 3:
+        return parts[0].strip(), va, parse_access(parts[2])
+    return parts[0].strip(), va
+
+
+def iter_text_trace(lines):
+    # One or more comma-separated PID:VA[:R|W|X[:CPU]] items per line, '#'
+    # starts a comment
+    for line in lines:
+        line = line.split("#", 1)[0]
+        for item in line.split(","):
+            item = item.strip()
+            if item:
+                yield parse_trace_item(item)
+
+
+def iter_csv_trace(lines):
+    for row in csv.reader(lines):
+        if not row or row[0].startswith("#"):
+            continue
+        if len(row) < 2:
+            raise ValueError(f"CSV trace rows need pid and address columns: {row}")
+        pid, va = row[0].strip(), row[1].strip()
+        try:
+            va = int(va)
+        except ValueError:
+            if pid.lower() == "pid":
+                continue  # header row
+            raise ValueError(f"Invalid virtual address in sequence: {va}")
+        if len(row) > 3 and row[3].strip():
+            yield pid, va, parse_access(row[2]) if row[2].strip() else READ, parse_cpu(row[3])
+        elif len(row) > 2 and row[2].strip():
+            yield pid, va, parse_access(row[2])
+        else:
+            yield pid, va
+
+
+def read_binary_header(stream):
+    if stream.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+        raise ValueError("Not a binary address trace.")
+    version = stream.read(1)
+    if not version or version[0] not in RECORDS:
+        raise ValueError(f"Unsupported binary trace version: {version[0] if version else None}")
+    (count,) = struct.unpack("<H", stream.read(2))
+    pids = []
+    for _ in range(count):
+        length = stream.read(1)[0]
+        pids.append(stream.read(length).decode("utf-8"))
+    return pids, version[0]
+
+
+def iter_binary_chunks(stream):
+    # Yields (pids, records, version) where records is a bytes-like block of
+    # whole records
+    pids, version = read_binary_header(stream)
+    record = RECORDS[version]
+    chunk_bytes = record.size * CHUNK_RECORDS
+    while True:
+        data = stream.read(chunk_bytes)
+        if not data:
+            return
+        if len(data) % record.size:
+            raise ValueError("Truncated record at the end of binary trace.")
+        yield pids, data, version
+
+
+def iter_binary_trace(stream):
+    for pids, data, version in iter_binary_chunks(stream):
+        if version == 1:
+            for index, va in RECORDS[1].iter_unpack(data):
+                yield pids[index], va
+        else:
+            for index, access, va in RECORDS[version].iter_unpack(data):
+                yield pids[index], va, access
+
+
+def iter_trace_chunks(trace, size=CHUNK_RECORDS):
+    # Batches a trace into (pids, vas, accesses) lists of up to size
+    # references; accesses stays None while every reference is a read
+    pids = []
+    vas = []
+    accesses = None
+    for item in trace:
+        if len(item) > 2 and item[2] != READ and accesses is None:
+            accesses = [READ] * len(pids)
+        pids.append(item[0])
+        vas.append(item[1])
+        if accesses is not None:
+            accesses.append(item[2] if len(item) > 2 else READ)
+        if len(pids) >= size:
+            yield pids, vas, accesses
+            pids = []
+            vas = []
+            accesses = None
+    if pids:
+        yield pids, vas, accesses
+
+
+def chunk_accesses(chunk):
+    # The access types of a chunk as a list, or None if all are reads
+    accesses = chunk[2] if len(chunk) > 2 else None
+    if accesses is None or isinstance(accesses, list):
+        return accesses
+    return accesses.tolist()
+
+
+def decode_binary_chunk(pids, data, version=TRACE_VERSION):
+    if np is not None:
+        if version == 1:
+            records = np.frombuffer(data, dtype=[("pid", "<u2"), ("va", "<u8")])
+            accesses = None
+        else:
+            records = np.frombuffer(data, dtype=[("pid", "<u2"), ("access", "u1"), ("va", "<u8")])
+            accesses = records["access"] if records["access"].any() else None
+        return np.array(pids, dtype=object)[records["pid"]].tolist(), records["va"], accesses
+    chunk_pids = []
+    vas = []
+    accesses = []
+    for record in RECORDS[version].iter_unpack(data):
+        chunk_pids.append(pids[record[0]])
+        vas.append(record[-1])
+        if version > 1:
+            accesses.append(record[1])
+    return chunk_pids, vas, accesses if any(accesses) else None
+
+
+def write_binary_header(out, pids):
+    if len(pids) > 0xFFFF:
+        raise ValueError("Binary traces hold at most 65535 processes.")
+    out.write(TRACE_MAGIC + bytes([TRACE_VERSION]) + struct.pack("<H", len(pids)))
+    for pid in pids:
+        encoded = pid.encode("utf-8")
+        out.write(bytes([len(encoded)]) + encoded)
+
+
+def encode_records(indices, vas, accesses=None):
+    # Packs a block of (pid index, access, va) records into their binary layout
+    if np is not None:
+        records = np.zeros(len(vas), dtype=[("pid", "<u2"), ("access", "u1"), ("va", "<u8")])
+        records["pid"] = indices
+        if accesses is not None:
+            records["access"] = accesses
+        records["va"] = vas
+        return records.tobytes()
+    pack = RECORD.pack
+    if accesses is None:
+        return b"".join([pack(index, READ, va) for index, va in zip(indices, vas)])
+    return b"".join([pack(index, access, va) for index, va, access in zip(indices, vas, accesses)])
+
+
+def write_binary_chunks(path, chunks, pids):
+    # chunks yield (pid indices, vas[, accesses]) blocks; returns the number
+    # of records
+    pids = list(pids)
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, "wb") as out:
+        write_binary_header(out, pids)
+        for chunk in chunks:
+            out.write(encode_records(chunk[0], chunk[1], chunk_accesses(chunk)))
+            count += len(chunk[1])
+    return count
+
+
+def write_binary_trace(path, trace, pids):
+    pids = list(pids)
+    index = {pid: i for i, pid in enumerate(pids)}
+
+    def indexed_chunks():
+        for chunk_pids, vas, accesses in iter_trace_chunks(trace):
+            indices = []
+            for pid in chunk_pids:
+                if pid not in index:
+                    raise ValueError(f"Invalid PID {pid} in sequence.")
+                indices.append(index[pid])
+            yield indices, vas, accesses
+
+    return write_binary_chunks(path, indexed_chunks(), pids)
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".bin", ".vmt")):
+        return "binary"
+    return "text"
+
+
+def open_binary(path):
+    # Plain binary traces are mapped rather than read so the OS pages them in
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return io.BytesIO(b"")  # empty file
+    return mapped
+
+
+def open_trace(path, fmt=None):
+    fmt = fmt or detect_format(path)
+    if fmt == "binary":
+        stream = open_binary(path)
+        try:
+            yield from iter_binary_trace(stream)
+        finally:
+            stream.close()
+        return
+    if fmt not in ("text", "csv"):
+        raise ValueError(f"Unknown trace format: {fmt}")
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", newline="") as f:
+        yield from (iter_csv_trace(f) if fmt == "csv" else iter_text_trace(f))
+
+
+def open_trace_chunks(path, fmt=None):
+    fmt = fmt or detect_format(path)
+    if fmt != "binary":
+        yield from iter_trace_chunks(open_trace(path, fmt))
+        return
+    stream = open_binary(path)
+    try:
+        for pids, data, version in iter_binary_chunks(stream):
+            yield decode_binary_chunk(pids, data, version)
+    finally:
+        stream.close()
+
+
+def validate_trace(trace, processes):
+    for item in trace:
+        pid, va = item[0], item[1]
+        process = processes.get(pid)
+        if process is None:
+            raise ValueError(f"Invalid PID {pid} in sequence.")
+        if va < 0 or va >= process.process_size:
+            raise ValueError(f"Address {va} out of range for process {pid}.")
+        if len(item) > 2 and item[2] not in (READ, WRITE, EXECUTE):
+            raise ValueError(f"Invalid access type {item[2]} in sequence.")
+        yield item
+
+
+def validate_trace_chunks(chunks, processes):
+    for chunk in chunks:
+        pids, vas = chunk[0], chunk[1]
+        for pid, va in zip(pids, vas if isinstance(vas, list) else vas.tolist()):
+            process = processes.get(pid)
+            if process is None:
+                raise ValueError(f"Invalid PID {pid} in sequence.")
+            if va < 0 or va >= process.process_size:
+                raise ValueError(f"Address {va} out of range for process {pid}.")
+        accesses = chunk_accesses(chunk)
+        if accesses is not None and max(accesses) > EXECUTE:
+            raise ValueError(f"Invalid access type {max(accesses)} in sequence.")
+        yield chunk
@@ -0,0 +1,107 @@
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+
+LOG_CAPACITY = 10000  # log lines kept in memory
+
+
+class RingLog:
+    # Keeps the newest capacity lines; with a spill path every line is also
+    # appended to that file, so the full log survives without growing memory
+    def __init__(self, capacity=LOG_CAPACITY, spill_path=None):
+        self.lines = deque(maxlen=capacity)
+        self.total = 0
+        self.spill = open(spill_path, "w", encoding="utf-8") if spill_path else None
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        return self.lines[index]
+
+    def append(self, line):
+        self.lines.append(line)
+        self.total += 1
+        if self.spill:
+            self.spill.write(line + "\n")
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def close(self):
+        if self.spill:
+            self.spill.close()
+            self.spill = None
+
+
+class VirtualListView(ttk.Frame):
+    # A Text widget that only ever holds the visible rows. The scrollbar is
+    # driven from the row count, and row(i) is called for each visible i on
+    # refresh, so the cost does not depend on how many rows there are.
+    def __init__(self, parent, height, width, follow=False, **text_options):
+        super().__init__(parent)
+        self.height = height
+        self.follow = follow  # keep showing the last rows as rows are added
+        self.title = None
+        self.count = 0
+        self.row = None
+        self.top = 0
+        self.text = tk.Text(self, height=height, width=width, wrap="none", **text_options)
+        self.text.pack(side="left")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.text.bind(sequence, self._on_mousewheel)
+
+    def visible_rows(self):
+        return self.height - (1 if self.title is not None else 0)
+
+    def set_source(self, count, row, title=None):
+        self.count = count
+        self.row = row
+        self.title = title
+        self.refresh()
+
+    def set_count(self, count):
+        at_end = self.top >= self.count - self.visible_rows()
+        self.count = count
+        if self.follow and at_end:
+            self.top = count
+        self.refresh()
+
+    def clear(self):
+        self.count = 0
+        self.row = None
+        self.title = None
+        self.top = 0
+        self.refresh()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.count)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.top += step * self.visible_rows() if args[2] == "pages" else step
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -3, "units")
+        else:
+            self.yview("scroll", 3, "units")
+        return "break"  # keep the outer panel from scrolling too
+
+    def refresh(self):
+        rows = self.visible_rows()
+        self.top = max(0, min(self.top, self.count - rows))
+        end = min(self.top + rows, self.count)
+        lines = [] if self.title is None else [self.title]
+        if self.row is not None:
+            lines.extend(self.row(i) for i in range(self.top, end))
+        self.text.delete(1.0, tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+        if self.count:
+            self.scrollbar.set(self.top / self.count, end / self.count)
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,334 @@
+import argparse
+import bisect
+import gzip
+import itertools
+import random
+import sys
+from math import gcd
+
+from trace_loader import ACCESS_NAMES, CHUNK_RECORDS, READ, WRITE, chunk_accesses, detect_format, write_binary_chunks
+
+try:
+    import numpy as np
+except ImportError:  # generators fall back to the random module
+    np = None
+
+# Registry of page reference models by name, in registration order
+WORKLOAD_MODELS = {}
+ZIPF_MAX_RANKS = 1 << 22  # Zipf popularity ranks beyond this are not modelled
+SCATTER = 0x9E3779B1  # multiplier that spreads Zipf ranks over the address space
+
+
+def register_model(cls):
+    WORKLOAD_MODELS[cls.name] = cls
+    return cls
+
+
+def available_models():
+    return list(WORKLOAD_MODELS)
+
+
+def create_model(name, num_pages, rng, **params):
+    if name not in WORKLOAD_MODELS:
+        raise ValueError(f"Unknown workload model: {name}")
+    return WORKLOAD_MODELS[name](num_pages, rng, **params)
+
+
+class PageModel:
+    # Produces page numbers in [0, num_pages). rng is a numpy Generator when
+    # numpy is installed and a random.Random otherwise; pages() returns an
+    # int64 array or a list to match.
+    name = None
+
+    def __init__(self, num_pages, rng):
+        if num_pages < 1:
+            raise ValueError("A workload needs at least one page.")
+        self.num_pages = num_pages
+        self.rng = rng
+
+    def pages(self, count):
+        raise NotImplementedError
+
+    def uniform(self, low, high, count):
+        if np is not None:
+            return self.rng.integers(low, high, count)
+        return [self.rng.randrange(low, high) for _ in range(count)]
+
+    def sequence(self, start, count, step, modulo):
+        # (start + i * step) % modulo for i in range(count)
+        if np is not None:
+            return (start + np.arange(count, dtype=np.int64) * step) % modulo
+        return [(start + i * step) % modulo for i in range(count)]
+
+
+@register_model
+class UniformModel(PageModel):
+    name = "Uniform"
+
+    def pages(self, count):
+        return self.uniform(0, self.num_pages, count)
+
+
+@register_model
+class ZipfModel(PageModel):
+    # Page of popularity rank r is referenced with probability ~ 1 / r^alpha.
+    # With scatter the ranks are spread over the address space by a
+    # multiplicative bijection instead of being the lowest pages.
+    name = "Zipf"
+
+    def __init__(self, num_pages, rng, alpha=1.0, scatter=True):
+        super().__init__(num_pages, rng)
+        ranks = min(num_pages, ZIPF_MAX_RANKS)
+        self.multiplier = SCATTER if scatter else 1
+        while scatter and gcd(self.multiplier, num_pages) != 1:
+            self.multiplier += 2
+        if np is not None:
+            weights = np.arange(1, ranks + 1, dtype=np.float64) ** -float(alpha)
+            self.cdf = np.cumsum(weights)
+            self.cdf /= self.cdf[-1]
+        else:
+            self.cdf = list(itertools.accumulate((rank ** -float(alpha) for rank in range(1, ranks + 1))))
+            total = self.cdf[-1]
+            self.cdf = [value / total for value in self.cdf]
+
+    def pages(self, count):
+        if np is not None:
+            ranks = np.minimum(np.searchsorted(self.cdf, self.rng.random(count)), len(self.cdf) - 1)
+            return ranks * self.multiplier % self.num_pages
+        last = len(self.cdf) - 1
+        return [min(bisect.bisect_left(self.cdf, self.rng.random()), last) * self.multiplier % self.num_pages
+                for _ in range(count)]
+
+
+@register_model
+class ScanModel(PageModel):
+    # Sequential sweep over the whole process, wrapping around at the end
+    name = "Scan"
+
+    def __init__(self, num_pages, rng, stride=1):
+        super().__init__(num_pages, rng)
+        self.stride = stride
+        self.position = 0
+
+    def pages(self, count):
+        pages = self.sequence(self.position, count, self.stride, self.num_pages)
+        self.position = (self.position + count * self.stride) % self.num_pages
+        return pages
+
+
+@register_model
+class LoopModel(PageModel):
+    # Repeats pages start .. start + length - 1, the classic case where LRU
+    # misses on every reference once length exceeds the frame count
+    name = "Loop"
+
+    def __init__(self, num_pages, rng, length=None, start=0):
+        super().__init__(num_pages, rng)
+        self.length = min(length or max(num_pages // 2, 1), num_pages - start)
+        if start < 0 or self.length < 1:
+            raise ValueError("Loop must lie inside the process.")
+        self.start = start
+        self.position = 0
+
+    def pages(self, count):
+        pages = self.sequence(self.position, count, 1, self.length)
+        self.position = (self.position + count) % self.length
+        if np is not None:
+            return pages + self.start
+        return [page + self.start for page in pages]
+
+
+@register_model
+class WorkingSetModel(PageModel):
+    # References fall in a window of pages with probability locality
+    # (uniformly anywhere otherwise); every phase references the window
+    # moves to a new random place in the process
+    name = "WorkingSet"
+
+    def __init__(self, num_pages, rng, window=32, phase=10000, locality=1.0):
+        super().__init__(num_pages, rng)
+        if phase < 1 or not 0 <= locality <= 1:
+            raise ValueError("Working set needs a positive phase and a locality between 0 and 1.")
+        self.window = max(1, min(window, num_pages))
+        self.phase = phase
+        self.locality = locality
+        self.left = 0
+        self.base = 0
+
+    def pages(self, count):
+        parts = []
+        while count:
+            if self.left == 0:
+                self.base = self.uniform(0, self.num_pages - self.window + 1, 1)[0]
+                self.left = self.phase
+            take = min(count, self.left)
+            parts.append(self.segment(take))
+            self.left -= take
+            count -= take
+        if np is not None:
+            return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        return [page for part in parts for page in part]
+
+    def segment(self, count):
+        local = self.uniform(self.base, self.base + self.window, count)
+        if self.locality >= 1:
+            return local
+        if np is not None:
+            far = self.rng.random(count) >= self.locality
+            local[far] = self.rng.integers(0, self.num_pages, int(far.sum()))
+            return local
+        return [page if self.rng.random() < self.locality else self.rng.randrange(self.num_pages)
+                for page in local]
+
+
+class WorkloadProcess:
+    # write_ratio is the fraction of references that are writes
+    def __init__(self, pid, size, model="Uniform", write_ratio=0.0, **params):
+        if not 0 <= write_ratio <= 1:
+            raise ValueError("Write ratio must be between 0 and 1.")
+        self.pid = pid
+        self.size = size
+        self.model = model
+        self.write_ratio = write_ratio
+        self.params = params
+
+
+def generate_indexed_chunks(processes, count, seed=0, page_size=4096, quantum=1, chunk_size=CHUNK_RECORDS):
+    # Yields (process indices, vas, accesses) blocks, with accesses None when
+    # no process writes. Processes take turns issuing
+    # quantum references each, and each one draws from its own random
+    # stream seeded from seed, so a run can be repeated exactly.
+    if not processes:
+        raise ValueError("At least one process must be defined.")
+    if quantum < 1:
+        raise ValueError("Quantum must be a positive number of references.")
+    if np is not None:
+        streams = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(len(processes))]
+    else:
+        streams = [random.Random(f"{seed}:{i}") for i in range(len(processes))]
+    models = []
+    for process, rng in zip(processes, streams):
+        num_pages = (process.size + page_size - 1) // page_size
+        models.append((create_model(process.model, num_pages, rng, **process.params), rng))
+    turns = len(processes)
+    writes = any(process.write_ratio for process in processes)
+    done = 0
+    while done < count:
+        size = min(chunk_size, count - done)
+        if np is not None:
+            owners = (np.arange(done, done + size, dtype=np.int64) // quantum) % turns
+            vas = np.empty(size, dtype=np.uint64)
+            accesses = np.zeros(size, dtype=np.uint8) if writes else None
+            for index, (model, rng) in enumerate(models):
+                mask = owners == index
+                taken = int(mask.sum())
+                if taken:
+                    pages = np.asarray(model.pages(taken), dtype=np.int64)
+                    offsets = rng.integers(0, page_size, taken)
+                    vas[mask] = np.minimum(pages * page_size + offsets, processes[index].size - 1)
+                    if processes[index].write_ratio:
+                        accesses[mask] = rng.random(taken) < processes[index].write_ratio
+        else:
+            owners = [(step // quantum) % turns for step in range(done, done + size)]
+            streams_out = []
+            for index, (model, rng) in enumerate(models):
+                taken = owners.count(index)
+                limit = processes[index].size - 1
+                ratio = processes[index].write_ratio
+                streams_out.append(iter([(min(page * page_size + rng.randrange(page_size), limit),
+                                          WRITE if ratio and rng.random() < ratio else READ)
+                                         for page in model.pages(taken)]))
+            references = [next(streams_out[owner]) for owner in owners]
+            vas = [va for va, _ in references]
+            accesses = [access for _, access in references] if writes else None
+        yield owners, vas, accesses
+        done += size
+
+
+def generate_chunks(processes, count, seed=0, page_size=4096, quantum=1, chunk_size=CHUNK_RECORDS):
+    # (pids, vas, accesses) blocks in the same shape as open_trace_chunks(),
+    # ready for SimulationEngine.run_chunks()
+    pids = [process.pid for process in processes]
+    for owners, vas, accesses in generate_indexed_chunks(processes, count, seed, page_size, quantum, chunk_size):
+        if np is not None:
+            yield np.array(pids, dtype=object)[owners].tolist(), vas, accesses
+        else:
+            yield [pids[owner] for owner in owners], vas, accesses
+
+
+def generate_trace(processes, count, seed=0, page_size=4096, quantum=1):
+    for chunk in generate_chunks(processes, count, seed, page_size, quantum):
+        pids, vas, accesses = chunk[0], chunk[1], chunk_accesses(chunk)
+        vas = vas if isinstance(vas, list) else vas.tolist()
+        yield from (zip(pids, vas) if accesses is None else zip(pids, vas, accesses))
+
+
+def write_workload(path, processes, count, seed=0, page_size=4096, quantum=1):
+    # Binary traces are written block by block; text and CSV line by line,
+    # with an access column only when some process writes
+    pids = [process.pid for process in processes]
+    if detect_format(path) == "binary":
+        return write_binary_chunks(path, generate_indexed_chunks(processes, count, seed, page_size, quantum), pids)
+    opener = gzip.open if path.endswith(".gz") else open
+    separator = "," if detect_format(path) == "csv" else ":"
+    writes = any(process.write_ratio for process in processes)
+    with opener(path, "wt", newline="") as out:
+        if separator == ",":
+            out.write("pid,va,access\n" if writes else "pid,va\n")
+        for chunk in generate_chunks(processes, count, seed, page_size, quantum):
+            vas = chunk[1] if isinstance(chunk[1], list) else chunk[1].tolist()
+            accesses = chunk_accesses(chunk)
+            if accesses is None:
+                out.write("".join(f"{pid}{separator}{va}\n" for pid, va in zip(chunk[0], vas)))
+            else:
+                out.write("".join(f"{pid}{separator}{va}{separator}{ACCESS_NAMES[access]}\n"
+                                  for pid, va, access in zip(chunk[0], vas, accesses)))
+    return count
+
+
+def parse_value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    return text
+
+
+def parse_workload_process(text):
+    # PID=SIZE[:MODEL[:key=value,...]]
+    if "=" not in text:
+        raise argparse.ArgumentTypeError("Processes must be given as PID=SIZE[:MODEL[:key=value,...]].")
+    pid, rest = text.split("=", 1)
+    parts = rest.split(":", 2)
+    params = {}
+    if len(parts) > 2:
+        for item in parts[2].split(","):
+            if "=" not in item:
+                raise argparse.ArgumentTypeError(f"Model parameters must be key=value: {item}")
+            key, value = item.split("=", 1)
+            params[key.strip()] = parse_value(value.strip())
+    model = parts[1].strip() if len(parts) > 1 else "Uniform"
+    if model not in WORKLOAD_MODELS:
+        raise argparse.ArgumentTypeError(f"Unknown workload model: {model}")
+    return WorkloadProcess(pid.strip(), int(parts[0]), model, **params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic multi-process address trace.")
+    parser.add_argument("-p", "--process", type=parse_workload_process, action="append", required=True,
+                        help=f"process as PID=SIZE[:MODEL[:key=value,...]], MODEL one of {', '.join(available_models())}")
+    parser.add_argument("-n", "--references", type=int, required=True, help="number of references")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=4096, help="page size the models work in")
+    parser.add_argument("--quantum", type=int, default=1, help="references per process turn")
+    parser.add_argument("-o", "--output", required=True, help="trace file (.bin/.vmt, .csv or text, optionally .gz)")
+    args = parser.parse_args(argv)
+    count = write_workload(args.output, args.process, args.references, args.seed, args.page_size, args.quantum)
+    print(f"Wrote {count} references to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()